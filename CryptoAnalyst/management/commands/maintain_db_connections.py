@@ -43,9 +43,11 @@ class Command(BaseCommand):
     def run_daemon(self, interval):
         """Run as daemon with continuous monitoring"""
         try:
+            # 按单调时钟对齐检查周期，检查本身的耗时和系统时间跳变都不会让周期漂移
+            start = time.monotonic()
             while True:
                 self.check_and_maintain_connections()
-                time.sleep(interval)
+                time.sleep(interval - ((time.monotonic() - start) % interval))
         except KeyboardInterrupt:
             self.stdout.write(self.style.WARNING('Database maintenance daemon stopped'))
 
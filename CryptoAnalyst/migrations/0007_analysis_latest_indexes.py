@@ -0,0 +1,21 @@
+# Generated by Django 4.2.10 on 2026-10-17 15:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CryptoAnalyst', '0006_initialize_china_market_data'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analysisreport',
+            index=models.Index(fields=['asset', 'language', '-timestamp'], name='report_asset_lang_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='technicalanalysis',
+            index=models.Index(fields=['asset', '-timestamp'], name='ta_asset_ts_idx'),
+        ),
+    ]
@@ -150,6 +150,9 @@ class TechnicalAnalysis(models.Model):
         ordering = ['-timestamp']
         get_latest_by = 'timestamp'
         unique_together = ('asset', 'period_start')
+        indexes = [
+            models.Index(fields=['asset', '-timestamp'], name='ta_asset_ts_idx'),
+        ]
 
     # 保持向后兼容
     @property
@@ -244,6 +247,10 @@ class AnalysisReport(models.Model):
     class Meta:
         ordering = ['-timestamp']
         get_latest_by = 'timestamp'
+        indexes = [
+            # 最新报告查询 (asset, language, 按时间倒序) 只扫描索引头部，不随历史数据增长
+            models.Index(fields=['asset', 'language', '-timestamp'], name='report_asset_lang_ts_idx'),
+        ]
 
     def __str__(self):
         return f"{self.asset.symbol} - {self.timestamp}"
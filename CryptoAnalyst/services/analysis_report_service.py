@@ -1,7 +1,7 @@
 from typing import Dict
 from datetime import datetime, timezone
 from CryptoAnalyst.models import Token, TechnicalAnalysis, AnalysisReport, Chain
-from CryptoAnalyst.utils import logger
+from CryptoAnalyst.utils import logger, strip_symbol_suffix
 
 class AnalysisReportService:
     """分析报告服务类"""
@@ -16,7 +16,7 @@ class AnalysisReportService:
         """
         try:
             # 统一 symbol 格式
-            clean_symbol = symbol.upper().replace('USDT', '').replace('-PERP', '').replace('_PERP', '').replace('PERP', '')
+            clean_symbol = strip_symbol_suffix(symbol)
 
             # 查找代币
             token = Token.objects.get(symbol=clean_symbol)
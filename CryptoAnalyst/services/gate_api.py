@@ -11,6 +11,7 @@ import datetime
 from typing import List, Optional, Dict, Union
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from django.core.cache import cache
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +33,11 @@ class GateAPI:
         self.funding_rate_cache_time = {}  # 资金费率缓存时间
         self.cache_ttl = 60  # 缓存有效期（秒）
 
+        # 复用 keep-alive 连接池，避免每次请求（包括重试）重新建立 TCP/TLS 连接
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=20)
+        self.session.mount('https://', adapter)
+
     def _init_client(self):
         if not self._client_initialized:
             try:
@@ -134,7 +140,7 @@ class GateAPI:
 
                 # 发送请求
                 start_time = time.time()
-                response = requests.request(method, url, params=params, data=body_str if data else None, headers=headers, timeout=10)
+                response = self.session.request(method, url, params=params, data=body_str if data else None, headers=headers, timeout=10)
                 elapsed = time.time() - start_time
 
                 # 检查响应状态
@@ -195,6 +201,33 @@ class GateAPI:
         logger.error(f"在{max_retries}次尝试后仍无法完成请求: {last_error}")
         return None
 
+    def _get_spot_ticker(self, gate_symbol: str) -> Optional[Dict]:
+        """
+        获取现货 ticker，结果在 Django 缓存中保留 cache_ttl 秒
+
+        实时价格和行情数据都来自同一个 /spot/tickers 接口，
+        通过 Django 缓存在同一进程的各个服务实例之间共享，避免重复请求
+        （默认的 LocMemCache 是进程内缓存，不会跨进程共享）
+
+        Args:
+            gate_symbol: Gate 格式的交易对，例如 'BTC_USDT'
+
+        Returns:
+            Dict: ticker 数据，如果获取失败则返回None
+        """
+        cache_key = f"gate:spot_tickers:{gate_symbol}"
+        ticker_data = cache.get(cache_key)
+        if ticker_data is not None:
+            return ticker_data
+
+        response = self._request('GET', '/spot/tickers', params={'currency_pair': gate_symbol})
+        if not response or len(response) == 0:
+            return None
+
+        ticker_data = response[0]
+        cache.set(cache_key, ticker_data, self.cache_ttl)
+        return ticker_data
+
     def get_realtime_price(self, symbol: str) -> Optional[float]:
         """
         获取实时价格
@@ -221,12 +254,9 @@ class GateAPI:
                 current_time - self.price_cache_time[symbol] < self.cache_ttl):
                 return self.price_cache[symbol]
 
-            endpoint = '/spot/tickers'
-            params = {'currency_pair': gate_symbol}
-
-            response = self._request('GET', endpoint, params=params)
-            if response and len(response) > 0:
-                price = float(response[0].get('last', 0))
+            ticker_data = self._get_spot_ticker(gate_symbol)
+            if ticker_data:
+                price = float(ticker_data.get('last', 0))
                 # 更新缓存
                 self.price_cache[symbol] = price
                 self.price_cache_time[symbol] = current_time
@@ -642,12 +672,8 @@ class GateAPI:
                 current_time - self.ticker_cache_time[symbol] < self.cache_ttl):
                 return self.ticker_cache[symbol]
 
-            endpoint = '/spot/tickers'
-            params = {'currency_pair': gate_symbol}
-
-            response = self._request('GET', endpoint, params=params)
-            if response and len(response) > 0:
-                ticker_data = response[0]
+            ticker_data = self._get_spot_ticker(gate_symbol)
+            if ticker_data:
                 # 更新缓存
                 self.ticker_cache[symbol] = ticker_data
                 self.ticker_cache_time[symbol] = current_time
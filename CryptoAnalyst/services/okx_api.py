@@ -31,6 +31,11 @@ class OKXAPI:
         self.funding_rate_cache = {}  # 资金费率缓存
         self.funding_rate_cache_time = {}  # 资金费率缓存时间
         self.cache_ttl = 60  # 缓存有效期（秒）
+
+        # 复用 keep-alive 连接池，避免每次请求（包括重试）重新建立 TCP/TLS 连接
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=20)
+        self.session.mount('https://', adapter)
     
     def _init_client(self):
         if not self._client_initialized:
@@ -154,7 +159,7 @@ class OKXAPI:
                 
                 # 发送请求
                 start_time = time.time()
-                response = requests.request(method, url, params=params, data=json.dumps(data) if data else None, headers=headers, timeout=10)
+                response = self.session.request(method, url, params=params, data=json.dumps(data) if data else None, headers=headers, timeout=10)
                 elapsed = time.time() - start_time
                 
                 # 检查响应状态
@@ -1,7 +1,8 @@
 import logging
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Token, TechnicalAnalysis, AnalysisReport
+from .models import Token, TechnicalAnalysis, AnalysisReport, MarketType
+from .utils import clear_asset_id_cache
 
 logger = logging.getLogger(__name__)
 
@@ -14,3 +15,11 @@ def log_technical_analysis_update(sender, instance, created, **kwargs):
     except Exception as e:
         logger.error(f"更新代币技术分析数据失败: {str(e)}")
 
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+@receiver(post_save, sender=MarketType)
+@receiver(post_delete, sender=MarketType)
+def invalidate_asset_id_cache(sender, **kwargs):
+    """资产或市场类型变更时清空进程内的资产 ID 缓存"""
+    clear_asset_id_cache()
@@ -4,15 +4,17 @@
 包含所有与定时任务相关的功能，如：
 - 更新技术指标参数
 - 生成分析报告
+- 按顺序串联上述两步
 """
 import logging
-from celery import shared_task
+from celery import shared_task, chain
 from django.utils import timezone
 from django.db import transaction
 
 from .models import Token, TechnicalAnalysis, AnalysisReport
 from .services.technical_analysis import TechnicalAnalysisService
 from .views_report import CryptoReportAPIView
+from .utils import strip_symbol_suffix
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -47,28 +49,31 @@ def update_technical_analysis():
         else:
             period_start = now.replace(hour=12, minute=0, second=0, microsecond=0)
 
+        # 一次查询取出当前周期已有技术分析数据的代币，避免逐个代币查询
+        analyzed_asset_ids = set(
+            TechnicalAnalysis.objects.filter(
+                period_start=period_start
+            ).values_list('asset_id', flat=True)
+        )
+
         # 更新每个代币的技术指标
         success_count = 0
         error_count = 0
+        skipped_count = 0
+        new_analyses = []
 
         for token in tokens:
             try:
                 symbol = token.symbol
 
-                # 检查是否已经有当前周期的技术分析数据
-                existing_analysis = TechnicalAnalysis.objects.filter(
-                    token=token,
-                    period_start=period_start
-                ).first()
-
-                if existing_analysis:
-                    logger.info(f"代币 {symbol} 在当前周期已有技术分析数据，跳过更新")
+                if token.id in analyzed_asset_ids:
+                    skipped_count += 1
                     continue
 
                 # 获取技术指标数据
                 # 为了与Gate API兼容，确保符号格式正确
                 # 清理符号格式，去除可能的USDT后缀
-                clean_symbol = symbol.upper().replace('USDT', '').replace('-PERP', '').replace('_PERP', '').replace('PERP', '')
+                clean_symbol = strip_symbol_suffix(symbol)
                 # 添加USDT后缀
                 api_symbol = f"{clean_symbol}USDT"
                 technical_data = ta_service.get_all_indicators(api_symbol)
@@ -109,22 +114,39 @@ def update_technical_analysis():
                     'mayer_multiple': indicators.get('MayerMultiple', 0)
                 }
 
-                # 保存技术分析数据
-                with transaction.atomic():
-                    technical_analysis = TechnicalAnalysis.objects.create(
-                        token=token,
-                        timestamp=timezone.now(),
-                        period_start=period_start,
-                        **formatted_indicators
-                    )
-
-                logger.info(f"成功更新代币 {symbol} 的技术指标数据，ID: {technical_analysis.id}")
-                success_count += 1
+                # 先收集，循环结束后统一批量写入
+                new_analyses.append(TechnicalAnalysis(
+                    asset=token,
+                    timestamp=timezone.now(),
+                    period_start=period_start,
+                    **formatted_indicators
+                ))
 
             except Exception as e:
                 logger.error(f"更新代币 {token.symbol} 的技术指标数据时发生错误: {str(e)}")
                 error_count += 1
 
+        # 单个事务内批量写入；(asset, period_start) 唯一约束冲突的行（并发任务已写入）直接忽略
+        if new_analyses:
+            queued_asset_ids = [analysis.asset_id for analysis in new_analyses]
+            try:
+                with transaction.atomic():
+                    TechnicalAnalysis.objects.bulk_create(new_analyses, batch_size=500, ignore_conflicts=True)
+            except Exception as e:
+                logger.error(f"批量写入 {len(new_analyses)} 条技术分析数据时发生错误: {str(e)}")
+                error_count += len(new_analyses)
+            else:
+                # ignore_conflicts 不返回实际插入的行数：写入后按当前周期实际存在的记录计数，
+                # 并发任务已写入的代币同样视为成功，仍然缺失的计为失败
+                success_count = TechnicalAnalysis.objects.filter(
+                    period_start=period_start,
+                    asset_id__in=queued_asset_ids
+                ).count()
+                error_count += len(new_analyses) - success_count
+
+        if skipped_count:
+            logger.info(f"{skipped_count} 个代币在当前周期已有技术分析数据，跳过更新")
+
         result_message = f"技术指标参数更新任务完成。成功: {success_count}, 失败: {error_count}, 总计: {len(tokens)}"
         logger.info(result_message)
         return result_message
@@ -185,7 +207,7 @@ def generate_analysis_reports():
 
                 # 为了与Gate API兼容，确保符号格式正确
                 # 清理符号格式，去除可能的USDT后缀
-                clean_symbol = symbol.upper().replace('USDT', '').replace('-PERP', '').replace('_PERP', '').replace('PERP', '')
+                clean_symbol = strip_symbol_suffix(symbol)
                 # 添加USDT后缀
                 api_symbol = f"{clean_symbol}USDT"
 
@@ -219,4 +241,18 @@ def generate_analysis_reports():
     except Exception as e:
         error_message = f"执行分析报告生成任务时发生错误: {str(e)}"
         logger.error(error_message)
-        return error_message
\ No newline at end of file
+        return error_message
+
+
+@shared_task
+def refresh_technical_analysis_and_reports():
+    """
+    先更新技术指标参数，完成后立即生成分析报告
+
+    用 Celery chain 串联两个任务，报告生成在指标更新结束后立刻开始，
+    不再依赖固定的时间间隔等待指标更新完成
+    """
+    workflow = chain(update_technical_analysis.si(), generate_analysis_reports.si())
+    result = workflow.apply_async()
+    logger.info(f"已提交技术指标更新和报告生成任务链，ID: {result.id}")
+    return result.id
@@ -0,0 +1,105 @@
+import threading
+import unittest
+from unittest import mock
+
+from django.test import SimpleTestCase
+from rest_framework.response import Response
+
+from CryptoAnalyst.utils import SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+    """测试并发请求合并"""
+
+    def _run_concurrently(self, flight, key, func, callers=5):
+        """让 callers 个线程同时以同一个 key 调用 flight.do，返回每个线程的结果或异常"""
+        outcomes = [None] * callers
+
+        def worker(i):
+            try:
+                outcomes[i] = flight.do(key, func)
+            except Exception as e:
+                outcomes[i] = e
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+        return outcomes
+
+    def test_concurrent_callers_share_one_result(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def func():
+            calls.append(1)
+            release.wait(timeout=5)
+            return object()
+
+        timer = threading.Timer(0.2, release.set)
+        timer.start()
+        outcomes = self._run_concurrently(flight, 'key', func)
+        timer.cancel()
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(outcome is outcomes[0] for outcome in outcomes))
+
+    def test_exception_is_raised_in_every_waiter(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def func():
+            calls.append(1)
+            release.wait(timeout=5)
+            raise ValueError('boom')
+
+        timer = threading.Timer(0.2, release.set)
+        timer.start()
+        outcomes = self._run_concurrently(flight, 'key', func)
+        timer.cancel()
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(isinstance(outcome, ValueError) for outcome in outcomes))
+
+    def test_key_is_released_after_the_call(self):
+        flight = SingleFlight()
+
+        self.assertEqual(flight.do('key', lambda: 1), 1)
+        with self.assertRaises(ValueError):
+            flight.do('key', mock.Mock(side_effect=ValueError))
+        self.assertEqual(flight.do('key', lambda: 2), 2)
+        self.assertEqual(flight._calls, {})
+
+
+class TechnicalIndicatorsCoalescingTest(SimpleTestCase):
+    """测试技术指标接口的请求合并键"""
+
+    def _request_key(self, path, user=None):
+        # 视图模块依赖 Django 配置，在测试运行时再导入
+        from django.contrib.auth.models import AnonymousUser
+        from rest_framework.test import APIRequestFactory
+        from CryptoAnalyst import views_technical_indicators
+
+        request = APIRequestFactory().get(path)
+        request.user = user or AnonymousUser()
+        view = views_technical_indicators.TechnicalIndicatorsAPIView()
+        with mock.patch.object(views_technical_indicators, '_inflight_requests') as flight:
+            flight.do.return_value = Response({})
+            view.get(request, 'BTC')
+        return flight.do.call_args[0][0]
+
+    def test_key_includes_query_string(self):
+        self.assertNotEqual(
+            self._request_key('/api/crypto/technical-indicators/BTC/?lang=en'),
+            self._request_key('/api/crypto/technical-indicators/BTC/?lang=zh')
+        )
+
+    def test_key_includes_user(self):
+        user = mock.Mock(pk=1, is_authenticated=True)
+        self.assertNotEqual(
+            self._request_key('/api/crypto/technical-indicators/BTC/'),
+            self._request_key('/api/crypto/technical-indicators/BTC/', user)
+        )
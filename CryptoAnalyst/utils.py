@@ -1,5 +1,10 @@
 import logging
 import json
+import os
+import re
+import atexit
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from typing import Dict, Any
 from datetime import datetime, timezone
 
@@ -20,9 +25,37 @@ formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(messag
 console_handler.setFormatter(formatter)
 file_handler.setFormatter(formatter)
 
+# 控制台和文件输出交给后台监听线程，调用方的 logger.info 只做一次入队，不阻塞在磁盘 I/O 上
+log_queue_handler = QueueHandler(queue.SimpleQueue())
+log_listener = None
+
+
+def _start_log_listener():
+    """在当前进程中启动日志监听线程
+
+    本模块在 apps.ready 阶段导入，早于 Celery prefork / gunicorn --preload 派生子进程；
+    子进程不会继承监听线程，因此 fork 后在子进程里换一个新队列并重新启动监听，
+    否则子进程的日志只入队、永远不会写出
+    """
+    global log_listener
+    log_queue_handler.queue = queue.SimpleQueue()
+    log_listener = QueueListener(log_queue_handler.queue, console_handler, file_handler, respect_handler_level=True)
+    log_listener.start()
+
+
+def _stop_log_listener():
+    """退出前写完队列中剩余的日志"""
+    if log_listener is not None:
+        log_listener.stop()
+
+
+_start_log_listener()
+atexit.register(_stop_log_listener)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_start_log_listener)
+
 # 添加处理器到日志记录器
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+logger.addHandler(log_queue_handler)
 
 def sanitize_float(value: Any, min_value: float = -1000000.0, max_value: float = 1000000.0) -> float:
     """确保浮点数值在合理范围内
@@ -133,6 +166,22 @@ def safe_json_loads(json_str: str) -> Dict:
         return {}
 
 
+# 交易对后缀（USDT / 永续合约标记），一次正则扫描完成剥离
+_SYMBOL_SUFFIX_RE = re.compile(r'USDT|-PERP|_PERP|PERP')
+
+
+def strip_symbol_suffix(symbol: str) -> str:
+    """去除交易对中的 USDT 和永续合约后缀，返回大写的基础代币符号
+
+    Args:
+        symbol: 交易对符号 (例如 'btcusdt', 'BTC-PERP')
+
+    Returns:
+        str: 基础代币符号 (例如 'BTC')
+    """
+    return _SYMBOL_SUFFIX_RE.sub('', symbol.upper())
+
+
 # Database utilities for robust connection handling
 import time
 from functools import wraps
@@ -156,10 +205,8 @@ def robust_db_operation(max_retries=3, retry_delay=1.0, exponential_backoff=True
 
             for attempt in range(max_retries + 1):
                 try:
-                    # Ensure connection is healthy before operation
-                    ensure_connection_health()
-
-                    # Execute the function
+                    # No pre-flight health check: stale connections surface as
+                    # OperationalError/InterfaceError and are closed + retried below
                     return func(*args, **kwargs)
 
                 except (OperationalError, InterfaceError) as e:
@@ -249,10 +296,121 @@ def safe_read_operation(func):
     return robust_db_operation(max_retries=5, retry_delay=0.5)(func)
 
 
+# In-flight request coalescing
+import threading
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls sharing the same key so only one of them does the work
+
+    The first caller for a key runs the function; callers arriving while it is still
+    running block until it finishes and receive the same result (or exception).
+    """
+
+    class _Call:
+        __slots__ = ('event', 'result', 'error')
+
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        """
+        Run func() for key, or wait for an identical in-flight call to finish
+
+        Args:
+            key: Hashable identity of the call
+            func: Zero-argument callable producing the result
+
+        Returns:
+            The result of func()
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = self._Call()
+
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+# Process-local asset id cache
+from collections import OrderedDict
+
+ASSET_ID_CACHE_SIZE = 10000
+_asset_id_cache = OrderedDict()
+_asset_id_cache_lock = threading.Lock()
+
+
+def get_cached_asset_id(market_type_name: str, symbol: str):
+    """
+    Get the cached Asset primary key for a (market type, symbol) pair
+
+    Args:
+        market_type_name: Market type name (e.g. 'crypto')
+        symbol: Asset symbol as used in the lookup
+
+    Returns:
+        int or None: Asset id or None if not cached
+    """
+    key = (market_type_name, symbol)
+    with _asset_id_cache_lock:
+        asset_id = _asset_id_cache.get(key)
+        if asset_id is not None:
+            _asset_id_cache.move_to_end(key)
+        return asset_id
+
+
+def set_cached_asset_id(market_type_name: str, symbol: str, asset_id: int):
+    """
+    Cache the Asset primary key for a (market type, symbol) pair, evicting the least recently used entry
+
+    Args:
+        market_type_name: Market type name
+        symbol: Asset symbol as used in the lookup
+        asset_id: Asset primary key
+    """
+    key = (market_type_name, symbol)
+    with _asset_id_cache_lock:
+        _asset_id_cache[key] = asset_id
+        _asset_id_cache.move_to_end(key)
+        if len(_asset_id_cache) > ASSET_ID_CACHE_SIZE:
+            _asset_id_cache.popitem(last=False)
+
+
+def clear_asset_id_cache():
+    """Drop all cached Asset ids (called when assets or market types change)"""
+    with _asset_id_cache_lock:
+        _asset_id_cache.clear()
+
+
 # Cache utilities for technical indicators
 from django.core.cache import cache
 import hashlib
 
+SUPPORTED_LANGUAGES = frozenset({'zh-CN', 'en-US', 'ja-JP', 'ko-KR'})
+
 
 def get_technical_indicators_cache_key(symbol: str, language: str) -> str:
     """
@@ -314,8 +472,7 @@ def invalidate_technical_indicators_cache(symbol: str, language: str = None):
         logger.info(f"Invalidated technical indicators cache for {symbol} ({language})")
     else:
         # Invalidate all languages for this symbol
-        languages = ['zh-CN', 'en-US', 'ja-JP', 'ko-KR']
-        for lang in languages:
+        for lang in SUPPORTED_LANGUAGES:
             cache_key = get_technical_indicators_cache_key(symbol, lang)
             cache.delete(cache_key)
         logger.info(f"Invalidated all technical indicators cache for {symbol}")
@@ -12,7 +12,7 @@ import time
 from .services.technical_analysis import TechnicalAnalysisService
 from .services.market_data_service import MarketDataService
 from .models import Token, AnalysisReport, TechnicalAnalysis
-from .utils import logger
+from .utils import logger, strip_symbol_suffix
 
 
 class TechnicalIndicatorsDataAPIView(APIView):
@@ -53,7 +53,7 @@ class TechnicalIndicatorsDataAPIView(APIView):
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
             # Clean symbol format
-            clean_symbol = symbol.upper().replace('USDT', '').replace('-PERP', '').replace('_PERP', '').replace('PERP', '')
+            clean_symbol = strip_symbol_suffix(symbol)
 
             # Simple synchronous token retrieval
             token = Token.objects.filter(symbol=symbol.upper()).first()
@@ -12,6 +12,7 @@ from concurrent.futures import ThreadPoolExecutor
 import time
 from datetime import datetime, timedelta
 import hashlib
+import heapq
 import re
 from xml.etree import ElementTree as ET
 
@@ -618,16 +619,13 @@ def get_crypto_news_data(symbol, limit):
             seen_urls.add(unique_key)
             unique_news.append(news)
 
-    # 按发布时间排序（RSS的pubDate格式可能不同，所以使用简单排序）
+    # 按发布时间取最新的 limit 条（RSS的pubDate格式可能不同，所以使用简单排序）
     try:
-        # 将新闻按来源分组，然后合并
-        unique_news.sort(key=lambda x: x.get('published_at', ''), reverse=True)
+        return heapq.nlargest(limit, unique_news, key=lambda x: x.get('published_at', ''))
     except Exception as e:
         logger.error(f"Error sorting news: {str(e)}")
         # 如果排序失败，至少保持原有顺序
-        pass
-
-    return unique_news[:limit]
+        return unique_news[:limit]
 
 
 def get_stock_news_data(symbol, limit):
@@ -698,13 +696,12 @@ def get_stock_news_data(symbol, limit):
             seen_urls.add(url)
             unique_news.append(news)
 
-    # 按发布时间排序
+    # 按发布时间取最新的 limit 条
     try:
-        unique_news.sort(key=lambda x: x.get('published_at', ''), reverse=True)
+        return heapq.nlargest(limit, unique_news, key=lambda x: x.get('published_at', ''))
     except Exception as e:
         logger.error(f"Error sorting news: {str(e)}")
-
-    return unique_news[:limit]
+        return unique_news[:limit]
 
 
 def fetch_newsapi_stock_news_sync(symbol, limit, newsapi_key):
@@ -833,13 +830,12 @@ def get_china_stock_news_data(symbol, limit):
                 seen_urls.add(url)
                 unique_news.append(news)
 
-        # 按发布时间排序
+        # 按发布时间取最新的 limit 条
         try:
-            unique_news.sort(key=lambda x: x.get('published_at', ''), reverse=True)
+            return heapq.nlargest(limit, unique_news, key=lambda x: x.get('published_at', ''))
         except Exception as e:
             logger.error(f"Error sorting China stock news: {str(e)}")
-
-        return unique_news[:limit]
+            return unique_news[:limit]
 
     except Exception as e:
         logger.error(f"Error in get_china_stock_news_data: {str(e)}")
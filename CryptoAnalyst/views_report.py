@@ -14,14 +14,14 @@ from datetime import datetime, timedelta
 from .models import Token, Chain, AnalysisReport, TechnicalAnalysis, Asset, MarketType
 from .views_indicators_data import TechnicalIndicatorsDataAPIView
 from .services.technical_analysis import TechnicalAnalysisService
-from .utils import invalidate_technical_indicators_cache
+from .utils import invalidate_technical_indicators_cache, strip_symbol_suffix
 
 logger = logging.getLogger(__name__)
 
 class CryptoReportAPIView(APIView):
     """加密货币分析报告API视图"""
 
-    SUPPORTED_LANGUAGES = ['en-US']
+    SUPPORTED_LANGUAGES = frozenset({'en-US'})
     COZE_BOT_IDS = {
         'en-US': settings.COZE_BOT_ID_EN
     }
@@ -281,7 +281,7 @@ class CryptoReportAPIView(APIView):
                 return self._get_stock_technical_data(clean_symbol)
             else:
                 # 加密货币符号：清理并可能添加USDT后缀
-                clean_symbol = symbol.upper().replace('USDT', '').replace('-PERP', '').replace('_PERP', '').replace('PERP', '')
+                clean_symbol = strip_symbol_suffix(symbol)
                 api_symbol = f"{clean_symbol}USDT" if not clean_symbol.endswith('USDT') else clean_symbol
 
             print(f"[DEBUG] 符号处理 - 原始: {symbol}, 清理后: {clean_symbol}, API符号: {api_symbol}, 市场类型: {market_type}")
@@ -631,7 +631,8 @@ class CryptoReportAPIView(APIView):
             print(f"[DEBUG] NUPL: {get_indicator_value(indicators.get('nupl') if not is_china else indicators.get('NUPL'))}")
             print(f"[DEBUG] MayerMultiple: {get_indicator_value(indicators.get('mayer_multiple') if not is_china else indicators.get('MayerMultiple'))}")
 
-            with transaction.atomic():
+            # 外层 @transaction.atomic 已开启事务，这里不再额外创建 SAVEPOINT
+            with transaction.atomic(savepoint=False):
                 # 根据市场类型确定键名格式
                 market_type_str = str(asset.market_type)
                 print(f"[DEBUG] 市场类型字符串: '{market_type_str}'")
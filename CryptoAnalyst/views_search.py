@@ -108,18 +108,16 @@ class AssetSearchAPIView(APIView):
                 query_upper = query.upper()
 
                 for pair in pairs:
+                    # 只处理USDT交易对，先过滤再取其他字段
+                    if pair.get('quote', '').upper() != 'USDT':
+                        continue
+
                     symbol = pair.get('id', '')
                     base = pair.get('base', '')
-                    quote = pair.get('quote', '')
-
-                    # 只处理USDT交易对
-                    if quote.upper() != 'USDT':
-                        continue
 
                     # Check if query matches symbol or base currency
-                    if (query_upper in symbol.upper() or
-                        query_upper == base.upper() or
-                        query_upper in base.upper()):
+                    # (子串匹配已经覆盖了 base 完全相等的情况)
+                    if query_upper in symbol.upper() or query_upper in base.upper():
 
                         results.append({
                             'symbol': symbol,
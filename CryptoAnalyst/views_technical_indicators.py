@@ -5,8 +5,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.http import HttpResponse
 from django.utils import timezone
-import time
+import orjson
 import logging
 import datetime
 import traceback
@@ -16,12 +17,55 @@ from .services.market_data_service import MarketDataService
 from .models import Asset, AnalysisReport, TechnicalAnalysis, MarketType
 from .utils import (
     safe_read_operation, safe_model_operation,
-    get_cached_technical_indicators, set_cached_technical_indicators
+    get_cached_technical_indicators, set_cached_technical_indicators,
+    get_cached_asset_id, set_cached_asset_id, SingleFlight
 )
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# 响应构建实际用到的列，避免 SELECT * 拉取无关的大字段
+REPORT_FIELDS = (
+    'id', 'timestamp', 'snapshot_price',
+    'trend_up_probability', 'trend_sideways_probability', 'trend_down_probability', 'trend_summary',
+    'rsi_analysis', 'rsi_support_trend',
+    'macd_analysis', 'macd_support_trend',
+    'bollinger_analysis', 'bollinger_support_trend',
+    'bias_analysis', 'bias_support_trend',
+    'psy_analysis', 'psy_support_trend',
+    'dmi_analysis', 'dmi_support_trend',
+    'vwap_analysis', 'vwap_support_trend',
+    'funding_rate_analysis', 'funding_rate_support_trend',
+    'exchange_netflow_analysis', 'exchange_netflow_support_trend',
+    'nupl_analysis', 'nupl_support_trend',
+    'mayer_multiple_analysis', 'mayer_multiple_support_trend',
+    'trading_action', 'trading_reason', 'entry_price', 'stop_loss', 'take_profit',
+    'risk_level', 'risk_score', 'risk_details',
+)
+
+INDICATOR_VALUE_FIELDS = (
+    'rsi', 'macd_line', 'macd_signal', 'macd_histogram',
+    'bollinger_upper', 'bollinger_middle', 'bollinger_lower',
+    'bias', 'psy', 'dmi_plus', 'dmi_minus', 'dmi_adx', 'vwap',
+    'funding_rate', 'exchange_netflow', 'nupl', 'mayer_multiple',
+)
+
+TECHNICAL_ANALYSIS_FIELDS = ('id', 'timestamp', 'asset__symbol') + INDICATOR_VALUE_FIELDS
+
+REPORT_PRICE_FIELDS = ('snapshot_price', 'entry_price', 'stop_loss', 'take_profit')
+
+# 同一完整路径（市场类型 + 代码 + 查询参数）、同一用户的并发请求只查询一次数据库
+_inflight_requests = SingleFlight()
+
+
+def _to_float_map(instance, fields, default=None):
+    """Convert numeric model fields to float in one pass, mapping None to default"""
+    result = {}
+    for name in fields:
+        value = getattr(instance, name)
+        result[name] = default if value is None else float(value)
+    return result
+
 
 class TechnicalIndicatorsAPIView(APIView):
     """Technical Indicators API View"""
@@ -29,6 +73,19 @@ class TechnicalIndicatorsAPIView(APIView):
 
     def get(self, request, symbol: str):
         """Synchronous processing of GET requests"""
+        # The full path (market type, symbol and query string) plus the user identify the
+        # response, so only requests that would get the same payload share one lookup
+        key = (request.get_full_path(), request.user.pk if request.user.is_authenticated else None)
+        response = _inflight_requests.do(key, lambda: self._get_response(request, symbol))
+        # 直接用 orjson 序列化，跳过 DRF 的内容协商和渲染器
+        return HttpResponse(
+            orjson.dumps(response.data, default=str),
+            content_type='application/json',
+            status=response.status_code
+        )
+
+    def _get_response(self, request, symbol: str):
+        """Load the technical indicators payload for a symbol"""
         try:
             # 检测市场类型 - 通过请求路径判断
             is_stock_request = '/api/stock/' in request.path
@@ -41,58 +98,71 @@ class TechnicalIndicatorsAPIView(APIView):
             else:
                 market_type_name = 'crypto'
 
-            # 获取或创建市场类型记录
-            market_type, _ = MarketType.objects.get_or_create(
-                name=market_type_name,
-                defaults={'description': f'{market_type_name.title()} Market'}
-            )
-
-            # 获取或创建资产记录
-            asset, _ = Asset.objects.get_or_create(
-                symbol=symbol,
-                market_type=market_type,
-                defaults={
-                    'name': symbol,
-                    'is_active': True
-                }
-            )
+            # 资产 ID 缓存在进程内，资产或市场类型变更时由信号清空
+            asset_id = get_cached_asset_id(market_type_name, symbol)
+            if asset_id is None:
+                # 获取或创建市场类型记录
+                market_type, _ = MarketType.objects.get_or_create(
+                    name=market_type_name,
+                    defaults={'description': f'{market_type_name.title()} Market'}
+                )
+
+                # 获取或创建资产记录
+                asset, _ = Asset.objects.get_or_create(
+                    symbol=symbol,
+                    market_type=market_type,
+                    defaults={
+                        'name': symbol,
+                        'is_active': True
+                    }
+                )
+                asset_id = asset.id
+                set_cached_asset_id(market_type_name, symbol, asset_id)
 
-            # 获取最新的技术分析记录（7天内）
-            time_window = timezone.now() - datetime.timedelta(days=7)
-            latest_analysis = TechnicalAnalysis.objects.filter(
-                asset=asset,
-                timestamp__gte=time_window
-            ).order_by('-timestamp').first()
-
-            if not latest_analysis:
-                # 尝试获取任何技术分析数据（不限时间）
-                any_analysis = TechnicalAnalysis.objects.filter(asset=asset).order_by('-timestamp').first()
-                if any_analysis:
-                    print(f"Found analysis for {symbol} but outside time window. Latest: {any_analysis.timestamp}")
-                    latest_analysis = any_analysis  # 使用最新的分析数据，不管时间
+            # 获取最新的技术分析记录：7天窗口内的最新记录必然也是全表最新记录，
+            # 因此一次查询即可同时用于报告关联和指标数值
+            try:
+                @safe_read_operation
+                def get_technical_analysis():
+                    return TechnicalAnalysis.objects.select_related('asset').filter(
+                        asset_id=asset_id
+                    ).only(*TECHNICAL_ANALYSIS_FIELDS).order_by('-timestamp').first()
+
+                technical_analysis = get_technical_analysis()
+            except Exception as e:
+                return Response({
+                    'status': 'error',
+                    'message': "Error occurred while querying technical analysis data, please try again later"
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            if not technical_analysis:
+                # 对于股票和A股请求，返回特殊的not_found状态
+                if market_type_name in ['stock', 'china']:
+                    market_display = 'stock' if market_type_name == 'stock' else 'A-share'
+                    print(f"No technical analysis data for {market_display} symbol: {symbol}")
+                    return Response({
+                        'status': 'not_found',
+                        'message': f'No technical analysis data available for {market_display} {symbol}. Please generate a new report first.',
+                        'symbol': symbol,
+                        'market_type': market_type_name
+                    }, status=status.HTTP_200_OK)  # 返回200状态码，让前端处理
                 else:
-                    # 对于股票和A股请求，返回特殊的not_found状态
-                    if market_type_name in ['stock', 'china']:
-                        market_display = 'stock' if market_type_name == 'stock' else 'A-share'
-                        print(f"No technical analysis data for {market_display} symbol: {symbol}")
-                        return Response({
-                            'status': 'not_found',
-                            'message': f'No technical analysis data available for {market_display} {symbol}. Please generate a new report first.',
-                            'symbol': symbol,
-                            'market_type': market_type_name
-                        }, status=status.HTTP_200_OK)  # 返回200状态码，让前端处理
-                    else:
-                        return Response({
-                            'status': 'error',
-                            'message': 'No technical analysis data available'
-                        }, status=status.HTTP_404_NOT_FOUND)
+                    return Response({
+                        'status': 'error',
+                        'message': 'No technical analysis data available'
+                    }, status=status.HTTP_404_NOT_FOUND)
+
+            time_window = timezone.now() - datetime.timedelta(days=7)
+            if technical_analysis.timestamp < time_window:
+                # 使用最新的分析数据，不管时间
+                print(f"Found analysis for {symbol} but outside time window. Latest: {technical_analysis.timestamp}")
 
             # 获取最新的英文报告
             latest_report = AnalysisReport.objects.filter(
-                asset=asset,
+                asset_id=asset_id,
                 language='en-US',
-                technical_analysis=latest_analysis
-            ).first()
+                technical_analysis=technical_analysis
+            ).only(*REPORT_FIELDS).first()
 
             if not latest_report:
                 return Response({
@@ -100,56 +170,17 @@ class TechnicalIndicatorsAPIView(APIView):
                     'message': 'No analysis report available'
                 }, status=status.HTTP_404_NOT_FOUND)
 
-            # Get related technical analysis data
-            try:
-                @safe_read_operation
-                def get_technical_analysis():
-                    start_time = time.time()
-                    ta_qs = TechnicalAnalysis.objects.select_related('asset').filter(
-                        asset=asset
-                    ).order_by('-timestamp')
-                    technical_analysis = ta_qs.first()
-                    duration = time.time() - start_time
-                    return technical_analysis
-
-                technical_analysis = get_technical_analysis()
-                
-                if not technical_analysis:
-                    error_messages = {
-                        'zh-CN': f"未找到代币 {symbol} 的技术分析数据",
-                        'en-US': f"Technical analysis data not found for token {symbol}",
-                        'ja-JP': f"トークン {symbol} のテクニカル分析データが見つかりません",
-                        'ko-KR': f"토큰 {symbol}에 대한 기술적 분석 데이터를 찾을 수 없습니다"
-                    }
-                    return Response({
-                        'status': 'not_found',
-                        'message': error_messages.get('en-US', error_messages['en-US']),
-                        'needs_refresh': True
-                    }, status=status.HTTP_404_NOT_FOUND)
-            except Exception as e:
-                return Response({
-                    'status': 'error',
-                    'message': "Error occurred while querying technical analysis data, please try again later"
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
             # Build response data
             try:
-                # Safely convert numeric values
-                def safe_float(value, field_name):
-                    if value is None:
-                        return None
-                    try:
-                        return float(value)
-                    except (ValueError, TypeError) as e:
-                        return None
+                prices = _to_float_map(latest_report, REPORT_PRICE_FIELDS)
 
                 response_data = {
                     'status': 'success',
                     'data': {
                         'symbol': symbol,
-                        'price': safe_float(latest_report.snapshot_price, 'snapshot_price'),
-                        'current_price': safe_float(latest_report.snapshot_price, 'snapshot_price'),
-                        'snapshot_price': safe_float(latest_report.snapshot_price, 'snapshot_price'),
+                        'price': prices['snapshot_price'],
+                        'current_price': prices['snapshot_price'],
+                        'snapshot_price': prices['snapshot_price'],
                         'last_update_time': latest_report.timestamp.isoformat(),
                         'is_stale': False,
                         'trend_analysis': {
@@ -164,9 +195,9 @@ class TechnicalIndicatorsAPIView(APIView):
                         'trading_advice': {
                             'action': latest_report.trading_action,
                             'reason': latest_report.trading_reason,
-                            'entry_price': safe_float(latest_report.entry_price, 'entry_price'),
-                            'stop_loss': safe_float(latest_report.stop_loss, 'stop_loss'),
-                            'take_profit': safe_float(latest_report.take_profit, 'take_profit'),
+                            'entry_price': prices['entry_price'],
+                            'stop_loss': prices['stop_loss'],
+                            'take_profit': prices['take_profit'],
                             'risk_level': latest_report.risk_level,
                             'risk_score': latest_report.risk_score,
                             'risk_details': latest_report.risk_details
@@ -194,52 +225,54 @@ class TechnicalIndicatorsAPIView(APIView):
     def _build_indicators_analysis(self, technical_analysis, latest_report, market_type_name):
         """构建指标分析数据，根据市场类型包含不同的指标"""
 
+        values = _to_float_map(technical_analysis, INDICATOR_VALUE_FIELDS, default=0.0)
+
         # 基础技术指标（所有市场都有）
         indicators = {
             'RSI': {
-                'value': safe_float(technical_analysis.rsi, 'rsi'),
+                'value': values['rsi'],
                 'analysis': latest_report.rsi_analysis,
                 'support_trend': latest_report.rsi_support_trend
             },
             'MACD': {
                 'value': {
-                    'line': safe_float(technical_analysis.macd_line, 'macd_line'),
-                    'signal': safe_float(technical_analysis.macd_signal, 'macd_signal'),
-                    'histogram': safe_float(technical_analysis.macd_histogram, 'macd_histogram')
+                    'line': values['macd_line'],
+                    'signal': values['macd_signal'],
+                    'histogram': values['macd_histogram']
                 },
                 'analysis': latest_report.macd_analysis,
                 'support_trend': latest_report.macd_support_trend
             },
             'BollingerBands': {
                 'value': {
-                    'upper': safe_float(technical_analysis.bollinger_upper, 'bollinger_upper'),
-                    'middle': safe_float(technical_analysis.bollinger_middle, 'bollinger_middle'),
-                    'lower': safe_float(technical_analysis.bollinger_lower, 'bollinger_lower')
+                    'upper': values['bollinger_upper'],
+                    'middle': values['bollinger_middle'],
+                    'lower': values['bollinger_lower']
                 },
                 'analysis': latest_report.bollinger_analysis,
                 'support_trend': latest_report.bollinger_support_trend
             },
             'BIAS': {
-                'value': safe_float(technical_analysis.bias, 'bias'),
+                'value': values['bias'],
                 'analysis': latest_report.bias_analysis,
                 'support_trend': latest_report.bias_support_trend
             },
             'PSY': {
-                'value': safe_float(technical_analysis.psy, 'psy'),
+                'value': values['psy'],
                 'analysis': latest_report.psy_analysis,
                 'support_trend': latest_report.psy_support_trend
             },
             'DMI': {
                 'value': {
-                    'plus_di': safe_float(technical_analysis.dmi_plus, 'dmi_plus'),
-                    'minus_di': safe_float(technical_analysis.dmi_minus, 'dmi_minus'),
-                    'adx': safe_float(technical_analysis.dmi_adx, 'dmi_adx')
+                    'plus_di': values['dmi_plus'],
+                    'minus_di': values['dmi_minus'],
+                    'adx': values['dmi_adx']
                 },
                 'analysis': latest_report.dmi_analysis,
                 'support_trend': latest_report.dmi_support_trend
             },
             'VWAP': {
-                'value': safe_float(technical_analysis.vwap, 'vwap'),
+                'value': values['vwap'],
                 'analysis': latest_report.vwap_analysis,
                 'support_trend': latest_report.vwap_support_trend
             }
@@ -294,22 +327,22 @@ class TechnicalIndicatorsAPIView(APIView):
             # 加密货币和美股特有指标
             indicators.update({
                 'FundingRate': {
-                    'value': safe_float(technical_analysis.funding_rate, 'funding_rate'),
+                    'value': values['funding_rate'],
                     'analysis': latest_report.funding_rate_analysis,
                     'support_trend': latest_report.funding_rate_support_trend
                 },
                 'ExchangeNetflow': {
-                    'value': safe_float(technical_analysis.exchange_netflow, 'exchange_netflow'),
+                    'value': values['exchange_netflow'],
                     'analysis': latest_report.exchange_netflow_analysis,
                     'support_trend': latest_report.exchange_netflow_support_trend
                 },
                 'NUPL': {
-                    'value': safe_float(technical_analysis.nupl, 'nupl'),
+                    'value': values['nupl'],
                     'analysis': latest_report.nupl_analysis,
                     'support_trend': latest_report.nupl_support_trend
                 },
                 'MayerMultiple': {
-                    'value': safe_float(technical_analysis.mayer_multiple, 'mayer_multiple'),
+                    'value': values['mayer_multiple'],
                     'analysis': latest_report.mayer_multiple_analysis,
                     'support_trend': latest_report.mayer_multiple_support_trend
                 }
@@ -467,13 +500,3 @@ class TechnicalIndicatorsAPIView(APIView):
         else:
             return 'sideways'  # 过高分红，需谨慎
 
-
-def safe_float(value, field_name):
-    """Safely convert value to float"""
-    try:
-        if value is None:
-            return 0.0
-        return float(value)
-    except (ValueError, TypeError):
-        logger.warning(f"Invalid {field_name} value: {value}, using default 0.0")
-        return 0.0
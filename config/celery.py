@@ -16,27 +16,21 @@ app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
 
 # 配置定时任务
 app.conf.beat_schedule = {
-    # 每天0点和12点更新技术指标参数
-    'update-technical-analysis-at-0': {
-        'task': 'CryptoAnalyst.tasks.update_technical_analysis',
+    # 每天0点和12点更新技术指标参数，完成后立即生成分析报告（任务链，无需错开时间等待）
+    'refresh-technical-analysis-and-reports-at-0': {
+        'task': 'CryptoAnalyst.tasks.refresh_technical_analysis_and_reports',
         'schedule': crontab(hour='0', minute='0'),  # 每天0点执行
         'args': (),
     },
-    'update-technical-analysis-at-12': {
-        'task': 'CryptoAnalyst.tasks.update_technical_analysis',
+    'refresh-technical-analysis-and-reports-at-12': {
+        'task': 'CryptoAnalyst.tasks.refresh_technical_analysis_and_reports',
         'schedule': crontab(hour='12', minute='0'),  # 每天12点执行
         'args': (),
     },
-
-    # 每天0:05和12:05生成分析报告（错开5分钟，确保技术指标已更新）
-    'generate-analysis-reports-at-0': {
-        'task': 'CryptoAnalyst.tasks.generate_analysis_reports',
-        'schedule': crontab(hour='0', minute='5'),  # 每天0:05执行
-        'args': (),
-    },
-    'generate-analysis-reports-at-12': {
-        'task': 'CryptoAnalyst.tasks.generate_analysis_reports',
-        'schedule': crontab(hour='12', minute='5'),  # 每天12:05执行
+    # 每2分钟批量检查待支付的加密货币订单，按收款地址每组只请求一次交易历史
+    'check-pending-crypto-payments': {
+        'task': 'user.tasks.check_pending_payments',
+        'schedule': crontab(minute='*/2'),
         'args': (),
     },
 }
@@ -59,8 +53,7 @@ app.conf.update(
     task_acks_late=True,
     task_reject_on_worker_lost=True,
 
-    # 结果后端设置
-    result_backend='django-db',
+    # 结果后端设置（使用 settings.CELERY_RESULT_BACKEND 中的 Redis，避免结果写入 MySQL）
     result_expires=3600,  # 1小时
 
     # 并发设置
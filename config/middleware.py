@@ -2,6 +2,7 @@
 Custom middleware for database connection management
 """
 import logging
+from django.conf import settings
 from django.db import connection
 from django.db.utils import OperationalError, InterfaceError
 from django.http import JsonResponse
@@ -11,37 +12,17 @@ logger = logging.getLogger(__name__)
 
 class DatabaseHealthCheckMiddleware:
     """
-    Middleware to ensure database connections are healthy before processing requests
+    Middleware to recover database connections when a request hits a database error
+
+    Stale connections are recycled lazily by Django (CONN_MAX_AGE + CONN_HEALTH_CHECKS),
+    so no pre-flight query is issued per request; process_exception is the safety net.
     """
     
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        # Check database connection health before processing request
-        if not self.check_database_connection():
-            logger.warning("Database connection unhealthy, attempting to reconnect")
-            self.ensure_database_connection()
-        
-        response = self.get_response(request)
-        return response
-
-    def check_database_connection(self):
-        """
-        Check if database connection is healthy
-        """
-        try:
-            # Simple query to test connection
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT 1")
-                cursor.fetchone()
-            return True
-        except (OperationalError, InterfaceError) as e:
-            logger.warning(f"Database connection check failed: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"Unexpected error during database connection check: {e}")
-            return False
+        return self.get_response(request)
 
     def ensure_database_connection(self):
         """
@@ -92,7 +73,10 @@ class DatabaseHealthCheckMiddleware:
 
 class ConnectionCleanupMiddleware:
     """
-    Middleware to clean up database connections after each request
+    Middleware to monitor per-request query counts (DEBUG only)
+
+    Stale connections are recycled by CONN_MAX_AGE / CONN_HEALTH_CHECKS rather than
+    pinged after every request.
     """
     
     def __init__(self, get_response):
@@ -102,27 +86,10 @@ class ConnectionCleanupMiddleware:
         try:
             response = self.get_response(request)
         finally:
-            # Clean up connections after each request to prevent leaks
-            try:
-                # Monitor query count for performance
-                if hasattr(connection, 'queries') and connection.queries:
-                    query_count = len(connection.queries)
-                    if query_count > 50:
-                        logger.warning(f"High query count in request: {query_count}")
-
-                # Close connection if it's been open too long or has issues
-                if connection.connection and hasattr(connection.connection, 'ping'):
-                    try:
-                        connection.connection.ping(reconnect=False)
-                    except:
-                        # Connection is stale, close it
-                        connection.close()
-
-            except Exception as e:
-                logger.warning(f"Error during connection cleanup: {e}")
-                try:
-                    connection.close()
-                except:
-                    pass
+            # Django only records connection.queries when DEBUG is on
+            if settings.DEBUG:
+                query_count = len(connection.queries)
+                if query_count > 50:
+                    logger.warning(f"High query count in request: {query_count}")
         
         return response
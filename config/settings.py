@@ -12,13 +12,17 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 import os
 from pathlib import Path
-import pymysql
 from dotenv import load_dotenv
 
 # 加载.env文件
 load_dotenv(override=True)  # 添加 override=True 参数，确保覆盖系统环境变量
 
-pymysql.install_as_MySQLdb()
+# 优先使用 mysqlclient (C 扩展)，未安装时回退到纯 Python 的 PyMySQL
+try:
+    import MySQLdb  # noqa: F401
+except ImportError:
+    import pymysql
+    pymysql.install_as_MySQLdb()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -264,6 +268,10 @@ CELERY_TIMEZONE = 'UTC'
 # Celery Beat settings
 # 定时任务配置已移至 celery.py 中
 
+# 加密货币支付：后台预热代币价格缓存的间隔（秒）。默认 0 不启动预热线程；
+# 只在承担支付请求的那一个进程上设置，避免每个 web/worker 进程都轮询 Moralis
+CRYPTO_PRICE_REFRESH_INTERVAL = int(os.getenv('CRYPTO_PRICE_REFRESH_INTERVAL', '0'))
+
 # Binance API配置
 BINANCE_API_KEY = os.getenv('BINANCE_API_KEY')
 BINANCE_API_SECRET = os.getenv('BINANCE_API_SECRET')
@@ -5,21 +5,16 @@
 
 import os
 import sys
-import django
 from decimal import Decimal
-
-# 设置Django环境
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
-django.setup()
-
-from user.services.crypto_payment_service import crypto_payment_service
-from user.models import MembershipOrder, MembershipPlan, User
-from django.utils import timezone
 from datetime import timedelta
 
 
 def test_payment_verification():
     """测试支付验证逻辑"""
+    # 在函数内导入，模块可以在已初始化的 Django 进程（shell / worker）中直接复用
+    from user.models import MembershipOrder, MembershipPlan, User
+    from django.utils import timezone
+
     print("=== 测试支付验证修复效果 ===")
     
     # 测试数据
@@ -31,7 +26,7 @@ def test_payment_verification():
     
     # 检查是否有使用相同hash的已支付订单
     existing_order = MembershipOrder.objects.filter(
-        payment_info__contains=test_tx_hash,
+        tx_hash=test_tx_hash,
         status='paid'
     ).first()
     
@@ -108,4 +103,10 @@ def test_payment_verification():
 
 
 if __name__ == '__main__':
+    import django
+
+    # 只有作为脚本运行时才设置Django环境
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    django.setup()
+
     test_payment_verification() 
\ No newline at end of file
@@ -2,20 +2,102 @@ from django.contrib import admin
 from django.urls import path
 from django.shortcuts import render
 from django.contrib import messages
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect, StreamingHttpResponse
 from django.urls import reverse
 from django.template.response import TemplateResponse
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, DateTimeField, F, Q, Value, When
+from django.core.paginator import Paginator
 import random
 import string
 import csv
 from datetime import datetime
-from .models import User, VerificationCode, InvitationCode, InvitationRecord, SystemSetting, MembershipPlan, MembershipOrder, PointsTransaction
+from .models import User, VerificationCode, InvitationCode, InvitationRecord, SystemSetting, MembershipPlan, MembershipOrder, PointsTransaction, annotate_premium_active
 
-class UserAdmin(admin.ModelAdmin):
+
+# 邀请码使用系统熵源生成（random.SystemRandom 基于 os.urandom），避免被预测
+INVITATION_CODE_ALPHABET = string.ascii_uppercase + string.digits
+_code_random = random.SystemRandom()
+
+# 会员管理页的统计数字缓存
+MEMBERSHIP_COUNTS_CACHE_KEY = 'admin:membership_counts'
+MEMBERSHIP_COUNTS_CACHE_TTL = 60
+
+
+def extended_premium_expires_at(now, duration):
+    """会员延期后的到期时间表达式，供 queryset.update() 使用
+
+    仍有效的会员在原到期时间上延长，其余用户从 now 开始计算。
+    MySQL 按从左到右的顺序执行 SET，update() 中需要把它放在 is_premium 之前，
+    这样 CASE 读到的才是修改前的 is_premium
+    """
+    return Case(
+        When(is_premium=True, premium_expires_at__gt=now, then=F('premium_expires_at') + duration),
+        default=Value(now + duration),
+        output_field=DateTimeField()
+    )
+
+
+def get_membership_counts():
+    """会员统计数字（总用户、会员、有效会员、过期会员），缓存 MEMBERSHIP_COUNTS_CACHE_TTL 秒"""
+    def compute():
+        from django.utils import timezone
+
+        # 四个统计数字在一条聚合查询中完成
+        now = timezone.now()
+        return User.objects.aggregate(
+            total=Count('id'),
+            premium=Count('id', filter=Q(is_premium=True)),
+            active=Count('id', filter=Q(is_premium=True, premium_expires_at__gt=now)),
+            expired=Count('id', filter=Q(is_premium=True, premium_expires_at__lte=now)),
+        )
+
+    return cache.get_or_set(MEMBERSHIP_COUNTS_CACHE_KEY, compute, MEMBERSHIP_COUNTS_CACHE_TTL)
+
+
+def invalidate_membership_counts():
+    """会员状态被修改后清除统计缓存"""
+    cache.delete(MEMBERSHIP_COUNTS_CACHE_KEY)
+
+
+class ChangelistOnlyMixin:
+    """列表页只读取 changelist_only_fields 中的列，修改页等其他页面仍读取完整记录
+
+    只对 GET 渲染列表生效：批量操作（actions）也 POST 到列表页地址，
+    它们需要完整记录，否则每个被延迟的字段都会逐行再查一次
+    """
+    changelist_only_fields = ()
+
+    def is_changelist_request(self, request):
+        match = request.resolver_match
+        return bool(match and match.url_name == f'{self.opts.app_label}_{self.opts.model_name}_changelist')
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.changelist_only_fields and request.method == 'GET' and self.is_changelist_request(request):
+            queryset = queryset.select_related(*self.list_select_related).only(*self.changelist_only_fields)
+        return queryset
+
+
+class Echo:
+    """csv.writer 的伪文件对象，write 直接返回写入的行，供流式响应使用"""
+
+    def write(self, value):
+        return value
+
+
+class UserAdmin(ChangelistOnlyMixin, admin.ModelAdmin):
     """用户管理类"""
     list_display = ('email', 'username', 'is_active', 'language', 'points', 'membership_status_display', 'premium_expires_at', 'inviter', 'created_at')
     search_fields = ('email', 'username')
     list_filter = ('is_active', 'language', 'is_premium')
+    list_select_related = ('inviter',)
+    # 列表页不读取密码哈希等 list_display 用不到的列
+    changelist_only_fields = (
+        'id', 'email', 'username', 'is_active', 'language', 'points', 'is_premium',
+        'premium_expires_at', 'created_at', 'inviter__id', 'inviter__email',
+    )
     readonly_fields = ('created_at', 'updated_at')
     fieldsets = (
         ('基本信息', {'fields': ('email', 'username', 'password')}),
@@ -26,6 +108,13 @@ class UserAdmin(admin.ModelAdmin):
         ('时间信息', {'fields': ('created_at', 'updated_at')}),
     )
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.is_changelist_request(request):
+            # 列表页由数据库一次性算出每行的会员状态
+            queryset = annotate_premium_active(queryset)
+        return queryset
+
     def membership_status_display(self, obj):
         """显示会员状态"""
         if obj.is_premium_active():
@@ -48,6 +137,7 @@ class UserAdmin(admin.ModelAdmin):
             premium_expires_at=expires_at
         )
 
+        invalidate_membership_counts()
         self.message_user(request, f"成功将 {updated} 个用户设置为高级会员（有效期30天）", messages.SUCCESS)
     make_premium.short_description = "设置为高级会员（30天）"
 
@@ -58,6 +148,7 @@ class UserAdmin(admin.ModelAdmin):
             premium_expires_at=None
         )
 
+        invalidate_membership_counts()
         self.message_user(request, f"成功移除 {updated} 个用户的高级会员权限", messages.SUCCESS)
     remove_premium.short_description = "移除高级会员权限"
 
@@ -66,20 +157,14 @@ class UserAdmin(admin.ModelAdmin):
         from django.utils import timezone
         from datetime import timedelta
 
-        for user in queryset:
-            if user.is_premium:
-                # 如果已经是会员，在现有基础上延长
-                if user.premium_expires_at and user.premium_expires_at > timezone.now():
-                    user.premium_expires_at += timedelta(days=30)
-                else:
-                    user.premium_expires_at = timezone.now() + timedelta(days=30)
-            else:
-                # 如果不是会员，设置为会员并设置到期时间
-                user.is_premium = True
-                user.premium_expires_at = timezone.now() + timedelta(days=30)
-            user.save()
-
-        count = queryset.count()
+        # 一条条件 UPDATE 在数据库中完成：仍有效的会员在现有基础上延长，其余用户设置为会员并从现在开始计算
+        now = timezone.now()
+        count = queryset.update(
+            premium_expires_at=extended_premium_expires_at(now, timedelta(days=30)),
+            is_premium=True,
+            updated_at=now
+        )
+        invalidate_membership_counts()
         self.message_user(request, f"成功为 {count} 个用户延长30天会员时间", messages.SUCCESS)
     extend_membership.short_description = "延长会员时间（30天）"
 
@@ -108,8 +193,8 @@ class UserAdmin(admin.ModelAdmin):
         min_points = request.GET.get('min_points', '')
         max_points = request.GET.get('max_points', '')
 
-        # 基础查询
-        queryset = User.objects.all()
+        # 基础查询（只取排行榜用到的列）
+        queryset = User.objects.only('id', 'username', 'email', 'points', 'created_at')
 
         # 应用筛选条件
         if min_points and min_points.isdigit():
@@ -123,39 +208,49 @@ class UserAdmin(admin.ModelAdmin):
         else:
             queryset = queryset.order_by('-points')
 
-        # 获取邀请记录统计
-        user_stats = {}
-        for user in queryset:
-            invitation_count = InvitationRecord.objects.filter(inviter=user).count()
-            user_stats[user.id] = {
-                'invitation_count': invitation_count
-            }
+        # 邀请人数在取用户的同一条查询里聚合
+        ranked_users = queryset.annotate(invitation_count=Count('sent_invitations'))
 
-        # 导出CSV
+        # 导出CSV（流式输出，逐块读取用户，不在内存中构建完整文件）
         if request.GET.get('export') == 'csv':
-            response = HttpResponse(content_type='text/csv')
+            writer = csv.writer(Echo())
+
+            def rows():
+                yield writer.writerow(['排名', '用户名', '邮箱', '积分', '邀请人数', '注册时间'])
+                # 直接读取元组，不为每一行构造 User 模型实例
+                user_rows = ranked_users.values_list(
+                    'username', 'email', 'points', 'invitation_count', 'created_at'
+                ).iterator(chunk_size=2000)
+                for i, (username, email, points, invitation_count, created_at) in enumerate(user_rows, 1):
+                    yield writer.writerow([
+                        i,
+                        username,
+                        email,
+                        points,
+                        invitation_count,
+                        created_at.strftime('%Y-%m-%d %H:%M:%S')
+                    ])
+
+            response = StreamingHttpResponse(rows(), content_type='text/csv')
             response['Content-Disposition'] = f'attachment; filename="user_points_leaderboard_{datetime.now().strftime("%Y%m%d%H%M%S")}.csv"'
+            return response
 
-            writer = csv.writer(response)
-            writer.writerow(['排名', '用户名', '邮箱', '积分', '邀请人数', '注册时间'])
+        # 页面只加载当前页的用户；总数用未聚合的查询统计，避免 COUNT 包一层 GROUP BY 子查询
+        paginator = Paginator(queryset, 100)
+        page_obj = paginator.get_page(request.GET.get('page', 1))
+        offset = (page_obj.number - 1) * paginator.per_page
+        users = list(ranked_users[offset:offset + paginator.per_page])
 
-            for i, user in enumerate(queryset, 1):
-                writer.writerow([
-                    i,
-                    user.username,
-                    user.email,
-                    user.points,
-                    user_stats[user.id]['invitation_count'],
-                    user.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-
-            return response
+        # 翻页链接保留当前的筛选和排序参数
+        query_params = request.GET.copy()
+        query_params.pop('page', None)
 
         # 渲染模板
         context = {
             'title': '用户积分排行榜',
-            'users': queryset,
-            'user_stats': user_stats,
+            'users': users,
+            'page_obj': page_obj,
+            'base_query': query_params.urlencode(),
             'order_by': order_by,
             'min_points': min_points,
             'max_points': max_points,
@@ -167,33 +262,52 @@ class UserAdmin(admin.ModelAdmin):
 
     def adjust_points_view(self, request):
         """调整用户积分视图"""
+        from django.utils import timezone
+
         if request.method == 'POST':
             try:
-                user_ids = request.POST.get('user_ids', '').split(',')
+                # 只解析一次用户ID，空串和非法值直接丢弃
+                user_ids = [int(i) for i in request.POST.get('user_ids', '').split(',') if i.strip().isdigit()]
                 points_change = int(request.POST.get('points_change', 0))
                 reason = request.POST.get('reason', '管理员调整')
 
-                if not user_ids or not points_change:
+                if not user_ids:
                     messages.error(request, '请选择用户并输入积分变化量')
                     return HttpResponseRedirect(request.get_full_path())
 
-                users = User.objects.filter(id__in=user_ids)
-                updated_count = 0
+                if points_change == 0:
+                    messages.warning(request, '积分变化量为0，未做任何调整')
+                    return HttpResponseRedirect(request.get_full_path())
+
+                users = []
+                transactions = []
+                now = timezone.now()
 
-                for user in users:
+                # in_bulk 一次查询返回 {id: user}，后续可按 id 直接取用户
+                users_by_id = User.objects.only('id', 'points').in_bulk(user_ids)
+                for user in users_by_id.values():
                     old_points = user.points
                     user.points = max(0, user.points + points_change)  # 确保积分不为负数
-                    user.save()
+                    if user.points == old_points:
+                        # 积分已为0时扣减不会产生变化，跳过写入
+                        continue
+                    user.updated_at = now
+                    users.append(user)
 
                     # 记录积分交易
-                    PointsTransaction.objects.create(
+                    transactions.append(PointsTransaction(
                         user=user,
                         transaction_type='earn' if points_change > 0 else 'spend',
                         amount=abs(points_change),
                         reason='admin_adjust',
                         description=f'{reason}（从{old_points}调整到{user.points}）'
-                    )
-                    updated_count += 1
+                    ))
+
+                # 积分更新和交易记录各一次批量写入，并在同一事务中提交
+                with transaction.atomic():
+                    User.objects.bulk_update(users, ['points', 'updated_at'], batch_size=1000)
+                    PointsTransaction.objects.bulk_create(transactions, batch_size=500)
+                updated_count = len(users)
 
                 messages.success(request, f'成功调整 {updated_count} 个用户的积分')
                 return HttpResponseRedirect(reverse('admin:user_user_changelist'))
@@ -203,7 +317,7 @@ class UserAdmin(admin.ModelAdmin):
 
         # 获取用户ID
         user_ids = request.GET.get('ids', '').split(',')
-        users = User.objects.filter(id__in=user_ids) if user_ids != [''] else []
+        users = annotate_premium_active(User.objects.filter(id__in=user_ids)) if user_ids != [''] else []
 
         context = {
             'title': '调整用户积分',
@@ -246,16 +360,15 @@ class UserAdmin(admin.ModelAdmin):
                     from datetime import timedelta
 
                     days = int(request.POST.get('days', 30))
+                    now = timezone.now()
 
-                    for user in users:
-                        if user.is_premium and user.premium_expires_at and user.premium_expires_at > timezone.now():
-                            user.premium_expires_at += timedelta(days=days)
-                        else:
-                            user.is_premium = True
-                            user.premium_expires_at = timezone.now() + timedelta(days=days)
-                        user.save()
+                    updated = users.update(
+                        premium_expires_at=extended_premium_expires_at(now, timedelta(days=days)),
+                        is_premium=True,
+                        updated_at=now
+                    )
 
-                    messages.success(request, f'成功为 {len(users)} 个用户延长 {days} 天会员时间')
+                    messages.success(request, f'成功为 {updated} 个用户延长 {days} 天会员时间')
 
                 elif action == 'remove_premium':
                     updated = users.update(
@@ -264,6 +377,7 @@ class UserAdmin(admin.ModelAdmin):
                     )
                     messages.success(request, f'成功移除 {updated} 个用户的高级会员权限')
 
+                invalidate_membership_counts()
                 return HttpResponseRedirect(request.get_full_path())
 
             except Exception as e:
@@ -272,16 +386,8 @@ class UserAdmin(admin.ModelAdmin):
         # 获取会员统计信息
         from django.utils import timezone
 
-        total_users = User.objects.count()
-        premium_users = User.objects.filter(is_premium=True).count()
-        active_premium_users = User.objects.filter(
-            is_premium=True,
-            premium_expires_at__gt=timezone.now()
-        ).count()
-        expired_premium_users = User.objects.filter(
-            is_premium=True,
-            premium_expires_at__lte=timezone.now()
-        ).count()
+        now = timezone.now()
+        stats = get_membership_counts()
 
         # 获取最近的会员订单
         recent_orders = MembershipOrder.objects.select_related('user', 'plan').order_by('-created_at')[:10]
@@ -304,17 +410,17 @@ class UserAdmin(admin.ModelAdmin):
         elif filter_type == 'expired':
             users_queryset = users_queryset.filter(
                 is_premium=True,
-                premium_expires_at__lte=timezone.now()
+                premium_expires_at__lte=now
             )
 
-        users_list = users_queryset.order_by('-created_at')[:50]  # 限制显示50个用户
+        users_list = annotate_premium_active(users_queryset, now).order_by('-created_at')[:50]  # 限制显示50个用户
 
         context = {
             'title': '会员管理',
-            'total_users': total_users,
-            'premium_users': premium_users,
-            'active_premium_users': active_premium_users,
-            'expired_premium_users': expired_premium_users,
+            'total_users': stats['total'],
+            'premium_users': stats['premium'],
+            'active_premium_users': stats['active'],
+            'expired_premium_users': stats['expired'],
             'recent_orders': recent_orders,
             'users_list': users_list,
             'search_query': search_query,
@@ -337,6 +443,7 @@ class InvitationCodeAdmin(admin.ModelAdmin):
     list_display = ('code', 'created_by', 'used_by', 'is_used', 'is_personal', 'created_at', 'used_at')
     search_fields = ('code', 'created_by__email', 'used_by__email')
     list_filter = ('is_used', 'is_personal')
+    list_select_related = ('created_by', 'used_by')
     readonly_fields = ('created_at', 'used_at')
 
     def get_urls(self):
@@ -352,15 +459,22 @@ class InvitationCodeAdmin(admin.ModelAdmin):
                 count = int(request.POST.get('count', 10))
                 count = min(max(count, 1), 100)  # 限制在1-100之间
 
-                codes = []
-                for _ in range(count):
-                    code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-                    invitation = InvitationCode.objects.create(
-                        code=code,
-                        created_by=request.user,
-                        is_personal=False
+                # 先生成去重后的候选码并剔除数据库中已存在的，再一次性批量插入
+                codes = set()
+                while len(codes) < count:
+                    candidates = {
+                        ''.join(_code_random.choices(INVITATION_CODE_ALPHABET, k=8))
+                        for _ in range(count - len(codes))
+                    }
+                    existing = set(
+                        InvitationCode.objects.filter(code__in=candidates).values_list('code', flat=True)
                     )
-                    codes.append(invitation)
+                    codes |= candidates - existing
+
+                InvitationCode.objects.bulk_create(
+                    [InvitationCode(code=code, created_by=request.user, is_personal=False) for code in codes],
+                    ignore_conflicts=True
+                )
 
                 self.message_user(request, f"成功生成 {count} 个邀请码", messages.SUCCESS)
                 return HttpResponseRedirect(reverse('admin:user_invitationcode_changelist'))
@@ -374,6 +488,7 @@ class InvitationRecordAdmin(admin.ModelAdmin):
     list_display = ('inviter', 'invitee', 'invitation_code', 'points_awarded', 'created_at')
     search_fields = ('inviter__email', 'invitee__email', 'invitation_code__code')
     list_filter = ('created_at',)
+    list_select_related = ('inviter', 'invitee', 'invitation_code')
     readonly_fields = ('created_at',)
 
 @admin.register(SystemSetting)
@@ -392,9 +507,15 @@ class MembershipPlanAdmin(admin.ModelAdmin):
 
 # 会员订单管理
 @admin.register(MembershipOrder)
-class MembershipOrderAdmin(admin.ModelAdmin):
+class MembershipOrderAdmin(ChangelistOnlyMixin, admin.ModelAdmin):
     list_display = ('order_id', 'user', 'plan', 'amount', 'status', 'payment_method', 'created_at', 'paid_at')
     list_filter = ('status', 'payment_method', 'created_at')
+    list_select_related = ('user', 'plan')
+    # 列表页不读取 payment_info 等大字段
+    changelist_only_fields = (
+        'id', 'order_id', 'amount', 'status', 'payment_method', 'created_at', 'paid_at',
+        'user__id', 'user__email', 'plan__id', 'plan__name', 'plan__price',
+    )
     search_fields = ('order_id', 'user__email', 'plan__name')
     readonly_fields = ('order_id', 'created_at')
 
@@ -405,24 +526,33 @@ class MembershipOrderAdmin(admin.ModelAdmin):
         from django.utils import timezone
         from datetime import timedelta
 
-        updated_count = 0
-        for order in queryset.filter(status='pending'):
+        orders = list(queryset.filter(status='pending').select_related('user', 'plan'))
+        # 同一用户的多个订单共用一个实例，会员时间才能逐单累加
+        users = {}
+        # 同一批订单使用同一个时间点，避免循环中先后处理的订单得到不同的时间
+        now = timezone.now()
+        for order in orders:
             order.status = 'paid'
-            order.paid_at = timezone.now()
-            order.save()
+            order.paid_at = now
 
             # 激活用户会员
-            user = order.user
-            if user.is_premium and user.premium_expires_at and user.premium_expires_at > timezone.now():
+            user = users.setdefault(order.user_id, order.user)
+            if user.is_premium and user.premium_expires_at and user.premium_expires_at > now:
                 # 如果已经是会员，延长时间
                 user.premium_expires_at += timedelta(days=order.plan.duration_days)
             else:
                 # 设置为会员
                 user.is_premium = True
-                user.premium_expires_at = timezone.now() + timedelta(days=order.plan.duration_days)
-            user.save()
-            updated_count += 1
+                user.premium_expires_at = now + timedelta(days=order.plan.duration_days)
+            user.updated_at = now
+
+        # 订单和用户各一条批量 UPDATE，并在同一事务中提交
+        with transaction.atomic():
+            MembershipOrder.objects.bulk_update(orders, ['status', 'paid_at'], batch_size=1000)
+            User.objects.bulk_update(list(users.values()), ['is_premium', 'premium_expires_at', 'updated_at'], batch_size=1000)
+        updated_count = len(orders)
 
+        invalidate_membership_counts()
         self.message_user(request, f'成功处理 {updated_count} 个订单，用户会员已激活', messages.SUCCESS)
     mark_as_paid.short_description = "标记为已支付并激活会员"
 
@@ -437,6 +567,7 @@ class MembershipOrderAdmin(admin.ModelAdmin):
 class PointsTransactionAdmin(admin.ModelAdmin):
     list_display = ('user', 'transaction_type', 'amount', 'reason', 'created_at')
     list_filter = ('transaction_type', 'reason', 'created_at')
+    list_select_related = ('user',)
     search_fields = ('user__email', 'description')
     readonly_fields = ('created_at',)
 
@@ -1,11 +1,13 @@
 from django.contrib import admin
 from django.template.response import TemplateResponse
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.urls import reverse
+from django.core.paginator import Paginator
 from django.db.models import Count, Sum
 import csv
 from datetime import datetime
-from .models import User, InvitationRecord
+from .models import User
+from .admin import Echo
 
 class PointsLeaderboardView(admin.views.main.ChangeList):
     """用户积分排行榜视图"""
@@ -26,8 +28,8 @@ class PointsLeaderboardView(admin.views.main.ChangeList):
         min_points = request.GET.get('min_points', '')
         max_points = request.GET.get('max_points', '')
         
-        # 基础查询
-        queryset = User.objects.all()
+        # 基础查询（邀请人数在同一条查询里聚合）
+        queryset = User.objects.annotate(invitation_count=Count('sent_invitations'))
         
         # 应用筛选条件
         if min_points and min_points.isdigit():
@@ -43,36 +45,28 @@ class PointsLeaderboardView(admin.views.main.ChangeList):
             
         return queryset
         
-    def get_user_stats(self, users):
-        """获取用户统计信息"""
-        user_stats = {}
-        for user in users:
-            invitation_count = InvitationRecord.objects.filter(inviter=user).count()
-            user_stats[user.id] = {
-                'invitation_count': invitation_count
-            }
-        return user_stats
-        
     def export_csv(self, request, queryset):
-        """导出CSV"""
-        response = HttpResponse(content_type='text/csv')
+        """导出CSV（流式输出，逐块读取用户）"""
+        writer = csv.writer(Echo())
+
+        def rows():
+            yield writer.writerow(['排名', '用户名', '邮箱', '积分', '邀请人数', '注册时间'])
+            # 直接读取元组，不为每一行构造 User 模型实例
+            user_rows = queryset.values_list(
+                'username', 'email', 'points', 'invitation_count', 'created_at'
+            ).iterator(chunk_size=2000)
+            for i, (username, email, points, invitation_count, created_at) in enumerate(user_rows, 1):
+                yield writer.writerow([
+                    i,
+                    username,
+                    email,
+                    points,
+                    invitation_count,
+                    created_at.strftime('%Y-%m-%d %H:%M:%S')
+                ])
+
+        response = StreamingHttpResponse(rows(), content_type='text/csv')
         response['Content-Disposition'] = f'attachment; filename="user_points_leaderboard_{datetime.now().strftime("%Y%m%d%H%M%S")}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['排名', '用户名', '邮箱', '积分', '邀请人数', '注册时间'])
-        
-        user_stats = self.get_user_stats(queryset)
-        
-        for i, user in enumerate(queryset, 1):
-            writer.writerow([
-                i,
-                user.username,
-                user.email,
-                user.points,
-                user_stats[user.id]['invitation_count'],
-                user.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            ])
-        
         return response
         
     def render(self):
@@ -84,14 +78,19 @@ class PointsLeaderboardView(admin.views.main.ChangeList):
         if self.request.GET.get('export') == 'csv':
             return self.export_csv(self.request, users)
         
-        # 获取用户统计信息
-        user_stats = self.get_user_stats(users)
-        
+        # 页面只渲染当前页的用户
+        page_obj = Paginator(users, 100).get_page(self.request.GET.get('page', 1))
+
+        # 翻页链接保留当前的筛选和排序参数
+        query_params = self.request.GET.copy()
+        query_params.pop('page', None)
+
         # 渲染模板
         context = {
             'title': '用户积分排行榜',
-            'users': users,
-            'user_stats': user_stats,
+            'users': page_obj.object_list,
+            'page_obj': page_obj,
+            'base_query': query_params.urlencode(),
             'order_by': self.request.GET.get('order_by', '-points'),
             'min_points': self.request.GET.get('min_points', ''),
             'max_points': self.request.GET.get('max_points', ''),
@@ -5,3 +5,7 @@ class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
     verbose_name = '用户管理'
+
+    def ready(self):
+        """应用启动时执行"""
+        import user.signals  # 导入信号处理器
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from user.tasks import check_pending_payments
+
+
+class Command(BaseCommand):
+    help = '批量检查待支付订单的链上到账情况'
+
+    def handle(self, *args, **options):
+        self.stdout.write('开始检查待支付订单...')
+        try:
+            results = check_pending_payments()
+            paid_count = sum(
+                1 for result in results.values() if result.get('status') == 'confirmed'
+            )
+            self.stdout.write(self.style.SUCCESS(f'检查完成: {len(results)} 个订单, {paid_count} 个已确认'))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'检查失败: {e}'))
@@ -27,8 +27,10 @@ class Command(BaseCommand):
             count = expired_orders.count()
             if count > 0:
                 self.stdout.write(f'将清理 {count} 个过期订单:')
-                for order in expired_orders[:10]:  # 只显示前10个
-                    self.stdout.write(f'  - {order.order_id} (用户: {order.user.email}, 金额: ${order.amount})')
+                # 只显示前10个，一条 JOIN 查询取出需要的列，不再逐个订单加载用户
+                sample = expired_orders.values_list('order_id', 'user__email', 'amount')[:10]
+                for order_id, email, amount in sample:
+                    self.stdout.write(f'  - {order_id} (用户: {email}, 金额: ${amount})')
                 if count > 10:
                     self.stdout.write(f'  ... 还有 {count - 10} 个订单')
             else:
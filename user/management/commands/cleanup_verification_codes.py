@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from user.models import VerificationCode
+from user.tasks import cleanup_expired_verification_codes, VERIFICATION_CODE_RETENTION
+
+
+class Command(BaseCommand):
+    help = '删除过期的验证码'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只显示将要删除的验证码数量，不实际执行删除',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write('执行模拟清理...')
+            count = VerificationCode.objects.filter(
+                expires_at__lt=timezone.now() - VERIFICATION_CODE_RETENTION
+            ).count()
+            if count > 0:
+                self.stdout.write(f'将删除 {count} 个过期验证码')
+            else:
+                self.stdout.write('没有找到过期的验证码')
+        else:
+            self.stdout.write('开始清理过期验证码...')
+            try:
+                cleanup_expired_verification_codes()
+                self.stdout.write(self.style.SUCCESS('过期验证码清理完成'))
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'清理失败: {e}'))
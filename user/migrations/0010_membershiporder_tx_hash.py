@@ -0,0 +1,38 @@
+# Generated by Django 4.2.10
+
+import json
+
+from django.db import migrations, models
+
+
+def backfill_tx_hash(apps, schema_editor):
+    """把已有订单 payment_info 里的 tx_hash 复制到独立的索引列"""
+    MembershipOrder = apps.get_model('user', 'MembershipOrder')
+    orders = []
+    for order in MembershipOrder.objects.only('id', 'payment_info').iterator(chunk_size=1000):
+        payment_info = order.payment_info
+        if isinstance(payment_info, str):
+            try:
+                payment_info = json.loads(payment_info)
+            except ValueError:
+                continue
+        if isinstance(payment_info, dict) and payment_info.get('tx_hash'):
+            order.tx_hash = payment_info['tx_hash']
+            orders.append(order)
+    MembershipOrder.objects.bulk_update(orders, ['tx_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0009_alter_pointstransaction_reason'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='membershiporder',
+            name='tx_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=80, null=True, verbose_name='交易哈希'),
+        ),
+        migrations.RunPython(backfill_tx_hash, migrations.RunPython.noop),
+    ]
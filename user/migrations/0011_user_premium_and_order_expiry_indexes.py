@@ -0,0 +1,21 @@
+# Generated by Django 4.2.10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0010_membershiporder_tx_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['is_premium', 'premium_expires_at'], name='user_premium_exp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membershiporder',
+            index=models.Index(fields=['status', 'expires_at'], name='order_status_exp_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0011_user_premium_and_order_expiry_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='verificationcode',
+            index=models.Index(fields=['email', 'is_used', 'expires_at'], name='vcode_email_used_exp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invitationcode',
+            index=models.Index(fields=['created_by', 'is_personal'], name='invcode_creator_personal_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membershiporder',
+            index=models.Index(fields=['user', 'status'], name='order_user_status_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.10
+
+from django.db import migrations, models
+import user.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0012_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='temporaryinvitation',
+            name='uuid',
+            field=models.UUIDField(default=user.models.uuid7, editable=False, help_text='用于认领的唯一标识符', unique=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.10
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def lowercase_emails(apps, schema_editor):
+    """已有用户的邮箱统一转为小写，与 User.save 的规范化保持一致
+
+    email 列是唯一的：只有大小写不同的邮箱转为小写后会冲突，先检查并列出冲突账户，
+    需要人工合并或修改后再执行迁移，避免 UPDATE 执行到一半失败
+    """
+    User = apps.get_model('user', 'User')
+    duplicates = list(
+        User.objects.annotate(l=Lower('email'))
+        .values('l')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+        .values_list('l', flat=True)
+    )
+    if duplicates:
+        conflicts = User.objects.annotate(l=Lower('email')).filter(l__in=duplicates).order_by('l', 'id')
+        details = '\n'.join(f'  id={user.id} email={user.email}' for user in conflicts)
+        raise RuntimeError(
+            '以下用户的邮箱只有大小写不同，转为小写后会违反唯一约束，'
+            f'请先合并或修改这些账户再执行迁移:\n{details}'
+        )
+
+    User.objects.update(email=Lower('email'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0013_temporaryinvitation_uuid7'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0014_lowercase_user_email'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='verificationcode',
+            index=models.Index(fields=['expires_at'], name='vcode_expires_idx'),
+        ),
+    ]
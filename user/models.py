@@ -1,10 +1,52 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-import random
-import string
+import os
+import itertools
+import secrets
+import base64
 from datetime import timedelta, datetime
 import uuid
+import time
+
+# 订单号序列号（每个进程独立递增）
+_order_seq = itertools.count()
+
+def random_code(length):
+    """生成 length 位大写随机码（base32 字符集 A-Z2-7），一次 os.urandom 调用取足随机字节"""
+    return base64.b32encode(secrets.token_bytes((length * 5 + 7) // 8)).decode()[:length]
+
+def uuid7():
+    """生成按时间排序的 UUIDv7（RFC 9562）：48 位毫秒时间戳 + 74 位随机数
+
+    新记录总是追加在唯一索引的末尾，不像 uuid4 那样随机插入导致页分裂
+    """
+    value = (time.time_ns() // 1_000_000 & 0xFFFFFFFFFFFF) << 80
+    value |= int.from_bytes(secrets.token_bytes(10), 'big')
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # variant 10
+    return uuid.UUID(int=value)
+
+def annotate_premium_active(queryset, now=None):
+    """在查询中由数据库算出 is_premium_active_db，列表中的所有用户使用同一个时间点"""
+    return queryset.annotate(is_premium_active_db=models.Case(
+        models.When(is_premium=True, premium_expires_at__gt=now or timezone.now(), then=models.Value(True)),
+        default=models.Value(False),
+        output_field=models.BooleanField()
+    ))
+
+def generate_order_id():
+    """生成按时间递增的订单号（Snowflake 结构）
+
+    毫秒时间戳 << 22 | 进程号低 10 位 << 12 | 序列号低 12 位，
+    同一进程内每毫秒 4096 个订单以内不会重复，补零到 20 位后按字符串排序即按时间排序
+    """
+    value = (time.time_ns() // 1_000_000) << 22 | (os.getpid() & 0x3FF) << 12 | (next(_order_seq) & 0xFFF)
+    return f"MB{value:020d}"
+
+def generate_username():
+    """生成随机用户名"""
+    return f"user_{random_code(8).lower()}"
 
 class UserManager(BaseUserManager):
     """自定义用户管理器"""
@@ -12,8 +54,8 @@ class UserManager(BaseUserManager):
         """创建普通用户"""
         if not email:
             raise ValueError('邮箱是必填项')
-        email = self.normalize_email(email)
-        username = f"user_{''.join(random.choices(string.ascii_lowercase + string.digits, k=8))}"
+        email = self.normalize_email(email).lower()
+        username = generate_username()
         user = self.model(username=username, email=email, **extra_fields)
         user.set_password(password)
         user.save(using=self._db)
@@ -79,32 +121,56 @@ class User(AbstractUser):
     class Meta:
         verbose_name = '用户'
         verbose_name_plural = verbose_name
+        indexes = [
+            # 会员统计和筛选 (is_premium, premium_expires_at 范围) 走索引范围扫描
+            models.Index(fields=['is_premium', 'premium_expires_at'], name='user_premium_exp_idx'),
+        ]
 
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        # 邮箱统一存成小写，所有查询都用精确匹配走唯一索引
+        if self.email:
+            self.email = self.email.lower()
+        super().save(*args, **kwargs)
+
     def get_personal_invitation_code(self):
         """获取用户的个人邀请码"""
-        # 查找用户创建的长期有效的邀请码
+        # 查找用户创建的长期有效的邀请码（已存在时只需这一次查询）
         invitation = InvitationCode.objects.filter(
             created_by=self,
             is_personal=True
         ).first()
+        if invitation:
+            return invitation
 
         # 如果没有，则创建一个
-        if not invitation:
-            code = f"U{self.id}{''.join(random.choices(string.ascii_uppercase + string.digits, k=6))}"
-            invitation = InvitationCode.objects.create(
-                code=code,
+        # MySQL 不支持带条件的唯一约束，这里锁住用户行串行化同一用户的并发请求，
+        # 拿到锁后再查一次，避免重复创建个人邀请码
+        with transaction.atomic():
+            User.objects.select_for_update().only('id').get(pk=self.pk)
+            invitation = InvitationCode.objects.filter(
                 created_by=self,
-                is_personal=True,
-                is_used=False  # 个人邀请码的is_used字段不再使用
-            )
+                is_personal=True
+            ).first()
+            if not invitation:
+                code = f"U{self.id}{random_code(6)}"
+                invitation = InvitationCode.objects.create(
+                    code=code,
+                    created_by=self,
+                    is_personal=True,
+                    is_used=False  # 个人邀请码的is_used字段不再使用
+                )
 
         return invitation
 
     def is_premium_active(self):
         """检查用户是否为有效的高级会员"""
+        # 通过 annotate_premium_active 查询出来的用户直接使用数据库算好的结果
+        is_active = getattr(self, 'is_premium_active_db', None)
+        if is_active is not None:
+            return is_active
         if not self.is_premium:
             return False
         if not self.premium_expires_at:
@@ -128,6 +194,12 @@ class VerificationCode(models.Model):
     class Meta:
         verbose_name = '验证码'
         verbose_name_plural = verbose_name
+        indexes = [
+            # 注册/重置密码时按 (email, is_used, expires_at) 查找有效验证码
+            models.Index(fields=['email', 'is_used', 'expires_at'], name='vcode_email_used_exp_idx'),
+            # 定期清理过期验证码 (expires_at < cutoff)
+            models.Index(fields=['expires_at'], name='vcode_expires_idx'),
+        ]
 
     def __str__(self):
         return f"{self.email} - {self.code}"
@@ -145,6 +217,10 @@ class InvitationCode(models.Model):
     class Meta:
         verbose_name = '邀请码'
         verbose_name_plural = verbose_name
+        indexes = [
+            # get_personal_invitation_code 按 (created_by, is_personal) 查找个人邀请码
+            models.Index(fields=['created_by', 'is_personal'], name='invcode_creator_personal_idx'),
+        ]
 
     def __str__(self):
         if self.is_personal:
@@ -182,21 +258,35 @@ class SystemSetting(models.Model):
     def __str__(self):
         return f"{self.key}: {self.value}"
 
+    INVITATION_POINTS_CACHE_KEY = 'sys:invitation_points'
+    # 默认缓存是进程内的 LocMemCache，保存设置时的信号只能清除当前进程的缓存，
+    # 其他进程最多在 TTL 内继续使用旧值，因此 TTL 保持在一分钟
+    INVITATION_POINTS_CACHE_TTL = 60
+
     @classmethod
     def get_invitation_points(cls):
-        """获取邀请积分设置"""
+        """获取邀请积分设置（短时缓存，设置修改时由信号清除当前进程的缓存）"""
+        from django.core.cache import cache
+
+        points = cache.get(cls.INVITATION_POINTS_CACHE_KEY)
+        if points is not None:
+            return points
+
         try:
             setting = cls.objects.get(key='invitation_points')
-            return int(setting.value)
+            points = int(setting.value)
         except (cls.DoesNotExist, ValueError):
             # 默认值为10
-            return 10
+            points = 10
+
+        cache.set(cls.INVITATION_POINTS_CACHE_KEY, points, cls.INVITATION_POINTS_CACHE_TTL)
+        return points
 
 # 新增临时邀请模型
 class TemporaryInvitation(models.Model):
     """暂存从网站捕获的邀请码，等待用户在插件中认领"""
     invitation_code = models.CharField(max_length=8, help_text="捕获的邀请码")
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True, help_text="用于认领的唯一标识符")
+    uuid = models.UUIDField(default=uuid7, editable=False, unique=True, help_text="用于认领的唯一标识符")
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -247,6 +337,7 @@ class MembershipOrder(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name='状态')
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES, null=True, blank=True, verbose_name='支付方式')
     payment_info = models.JSONField(default=dict, blank=True, verbose_name='支付信息')
+    tx_hash = models.CharField(max_length=80, null=True, blank=True, db_index=True, verbose_name='交易哈希')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     paid_at = models.DateTimeField(null=True, blank=True, verbose_name='支付时间')
     expires_at = models.DateTimeField(null=True, blank=True, verbose_name='过期时间')
@@ -255,6 +346,12 @@ class MembershipOrder(models.Model):
         verbose_name = '会员订单'
         verbose_name_plural = verbose_name
         ordering = ['-created_at']
+        indexes = [
+            # 过期订单清理 (status='pending', expires_at < now)
+            models.Index(fields=['status', 'expires_at'], name='order_status_exp_idx'),
+            # 用户的待支付订单检查 (user, status='pending')
+            models.Index(fields=['user', 'status'], name='order_user_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.order_id} - {self.user.email} - {self.plan.name}"
@@ -262,8 +359,7 @@ class MembershipOrder(models.Model):
     def save(self, *args, **kwargs):
         if not self.order_id:
             # 生成订单号
-            import time
-            self.order_id = f"MB{int(time.time())}{random.randint(1000, 9999)}"
+            self.order_id = generate_order_id()
         super().save(*args, **kwargs)
 
 class PointsTransaction(models.Model):
@@ -4,7 +4,39 @@ from rest_framework.authtoken.models import Token
 from .models import User, VerificationCode, InvitationCode, InvitationRecord, MembershipPlan, MembershipOrder, PointsTransaction
 from datetime import datetime, timedelta
 from django.utils import timezone
-import re
+from django.db.models import Prefetch
+
+class NormalizedEmailField(serializers.EmailField):
+    """小写化的邮箱字段，与 User 中存储的邮箱格式一致"""
+    def to_internal_value(self, data):
+        return super().to_internal_value(data).lower()
+
+def check_password_strength(password):
+    """检查密码强度，要求至少6位，包含字母和数字
+
+    一次遍历同时记录是否出现过 ASCII 字母和数字，两者都出现即返回
+    """
+    if len(password) < 6:
+        return False
+    has_alpha = has_digit = False
+    for c in password:
+        if 'a' <= c <= 'z' or 'A' <= c <= 'Z':
+            has_alpha = True
+        elif '0' <= c <= '9':
+            has_digit = True
+        else:
+            continue
+        if has_alpha and has_digit:
+            return True
+    return False
+
+# 预取用户的个人邀请码，供 UserSerializer.get_invitation_code 使用：
+# User.objects.prefetch_related(PERSONAL_CODES_PREFETCH)
+PERSONAL_CODES_PREFETCH = Prefetch(
+    'created_invitation_codes',
+    queryset=InvitationCode.objects.filter(is_personal=True).only('id', 'code', 'created_by_id'),
+    to_attr='_personal_codes'
+)
 
 class UserSerializer(serializers.ModelSerializer):
     """用户序列化器"""
@@ -16,13 +48,20 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'points', 'invitation_code', 'is_premium', 'premium_expires_at', 'created_at', 'updated_at']
 
     def get_invitation_code(self, obj):
-        """获取用户的个人邀请码"""
+        """获取用户的个人邀请码
+
+        序列化用户列表时，调用方可以用 PERSONAL_CODES_PREFETCH 预取个人邀请码，
+        避免每个用户单独查询一次
+        """
+        codes = getattr(obj, '_personal_codes', None)
+        if codes:
+            return codes[0].code
         invitation = obj.get_personal_invitation_code()
         return invitation.code if invitation else None
 
 class RegisterSerializer(serializers.Serializer):
     """注册序列化器"""
-    email = serializers.EmailField()
+    email = NormalizedEmailField()
     password = serializers.CharField(write_only=True, min_length=6)
     code = serializers.CharField(min_length=6, max_length=6)
     invitation_code = serializers.CharField(required=False, allow_blank=True)
@@ -33,15 +72,15 @@ class RegisterSerializer(serializers.Serializer):
         return value
 
     def validate_code(self, value):
-        email = self.initial_data.get('email')
-        verification = VerificationCode.objects.filter(
+        email = str(self.initial_data.get('email') or '').lower()
+        verification_exists = VerificationCode.objects.filter(
             email=email,
             code=value,
             is_used=False,
             expires_at__gt=timezone.now()
-        ).first()
+        ).exists()
 
-        if not verification:
+        if not verification_exists:
             raise serializers.ValidationError("验证码无效或已过期")
         return value
 
@@ -50,32 +89,27 @@ class RegisterSerializer(serializers.Serializer):
             return value
 
         # 验证邀请码是否存在且有效
-        invitation = InvitationCode.objects.filter(code=value).first()
-        if not invitation:
+        if not InvitationCode.objects.filter(code=value).exists():
             raise serializers.ValidationError("邀请码不存在")
 
         return value
 
 class LoginSerializer(serializers.Serializer):
     """登录序列化器"""
-    email = serializers.EmailField()
+    email = NormalizedEmailField()
     password = serializers.CharField(write_only=True)
 
 class SendVerificationCodeSerializer(serializers.Serializer):
     """发送验证码序列化器"""
-    email = serializers.EmailField()
+    email = NormalizedEmailField()
 
     def validate_email(self, value):
-        # 检查是否已经发送过未使用的验证码
-        existing_code = VerificationCode.objects.filter(
+        # 如果已经发送过未使用且未过期的验证码，直接删除（一条 DELETE ... WHERE）
+        VerificationCode.objects.filter(
             email=value,
             is_used=False,
             expires_at__gt=timezone.now()
-        ).first()
-
-        if existing_code:
-            # 如果存在未过期的验证码，删除它
-            existing_code.delete()
+        ).delete()
 
         # 检查邮箱是否已注册
         if User.objects.filter(email=value).exists():
@@ -83,6 +117,17 @@ class SendVerificationCodeSerializer(serializers.Serializer):
 
         return value
 
+def rotate_auth_token(user):
+    """轮换用户的认证令牌，返回新的 key
+
+    已有令牌时用一条 UPDATE 原地替换 key，不再先 DELETE 再 INSERT，
+    也不会出现用户暂时没有令牌的窗口；没有令牌时才创建
+    """
+    key = Token.generate_key()
+    if Token.objects.filter(user=user).update(key=key):
+        return key
+    return Token.objects.create(user=user, key=key).key
+
 class TokenRefreshSerializer(serializers.Serializer):
     """Token刷新序列化器"""
     token = serializers.CharField(read_only=True)
@@ -95,11 +140,7 @@ class TokenRefreshSerializer(serializers.Serializer):
 
     def create(self, validated_data):
         user = self.context['request'].user
-        # 删除旧token
-        Token.objects.filter(user=user).delete()
-        # 创建新token
-        token = Token.objects.create(user=user)
-        return {'token': token.key}
+        return {'token': rotate_auth_token(user)}
 
 class ChangePasswordSerializer(serializers.Serializer):
     """修改密码序列化器"""
@@ -114,22 +155,14 @@ class ChangePasswordSerializer(serializers.Serializer):
 
         # 验证新密码的强度
         password = attrs['new_password']
-        if not self._check_password_strength(password):
+        if not check_password_strength(password):
             raise serializers.ValidationError({"new_password": "密码强度不足，请使用包含字母、数字的6位以上密码"})
 
         return attrs
 
-    def _check_password_strength(self, password):
-        """检查密码强度，要求至少6位，包含字母和数字"""
-        if len(password) < 6:
-            return False
-        if not re.search(r'[A-Za-z]', password) or not re.search(r'[0-9]', password):
-            return False
-        return True
-
 class ResetPasswordWithCodeSerializer(serializers.Serializer):
     """使用验证码重置密码序列化器"""
-    email = serializers.EmailField(required=True)
+    email = NormalizedEmailField(required=True)
     code = serializers.CharField(min_length=6, max_length=6, required=True)
     new_password = serializers.CharField(write_only=True, required=True, min_length=6)
     confirm_password = serializers.CharField(write_only=True, required=True)
@@ -141,47 +174,35 @@ class ResetPasswordWithCodeSerializer(serializers.Serializer):
 
         # 验证新密码的强度
         password = attrs['new_password']
-        if not self._check_password_strength(password):
+        if not check_password_strength(password):
             raise serializers.ValidationError({"new_password": "密码强度不足，请使用包含字母、数字的6位以上密码"})
 
         # 验证验证码
         email = attrs['email']
         code = attrs['code']
-        verification = VerificationCode.objects.filter(
+        verification_exists = VerificationCode.objects.filter(
             email=email,
             code=code,
             is_used=False,
             expires_at__gt=timezone.now()
-        ).first()
+        ).exists()
 
-        if not verification:
+        if not verification_exists:
             raise serializers.ValidationError({"code": "验证码无效或已过期"})
 
         return attrs
 
-    def _check_password_strength(self, password):
-        """检查密码强度，要求至少6位，包含字母和数字"""
-        if len(password) < 6:
-            return False
-        if not re.search(r'[A-Za-z]', password) or not re.search(r'[0-9]', password):
-            return False
-        return True
-
 class ResetPasswordCodeSerializer(serializers.Serializer):
     """重置密码验证码序列化器"""
-    email = serializers.EmailField()
+    email = NormalizedEmailField()
 
     def validate_email(self, value):
-        # 检查是否已经发送过未使用的验证码
-        existing_code = VerificationCode.objects.filter(
+        # 如果已经发送过未使用且未过期的验证码，直接删除（一条 DELETE ... WHERE）
+        VerificationCode.objects.filter(
             email=value,
             is_used=False,
             expires_at__gt=timezone.now()
-        ).first()
-
-        if existing_code:
-            # 如果存在未过期的验证码，删除它
-            existing_code.delete()
+        ).delete()
 
         # 检查邮箱是否已注册 (必须已注册才能重置密码)
         if not User.objects.filter(email=value).exists():
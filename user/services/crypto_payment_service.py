@@ -1,16 +1,196 @@
 import os
+import atexit
+import asyncio
+import aiohttp
 import requests
+from urllib3.util.retry import Retry
+from asgiref.sync import sync_to_async
+from celery.signals import worker_process_shutdown
 import json
+import orjson
 import logging
-from decimal import Decimal
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from decimal import Decimal, ROUND_UP
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from datetime import datetime, timedelta, timezone as dt_timezone
 
 logger = logging.getLogger(__name__)
 
+# 代币合约地址映射
+TOKEN_ADDRESSES = {
+    'USDT': {
+        'ethereum': '0xdac17f958d2ee523a2206206994597c13d831ec7',
+        'bsc': '0x55d398326f99059ff775485246999027b3197955',
+        'polygon': '0xc2132d05d31c914a87c6611c10748aeb04b58e8f'
+    },
+    'USDC': {
+        'ethereum': '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48',
+        'bsc': '0x8ac76a51cc950d9822d68b83fe1ad97b32cd580d',
+        'polygon': '0x2791bca1f2de4661ed88a30c99a7a9449aa84174'
+    }
+}
+
+# 支持的 (代币, 网络) 组合，不支持的组合在请求 Moralis 之前直接拒绝
+SUPPORTED_PAIRS = frozenset(
+    (symbol, network) for symbol, networks in TOKEN_ADDRESSES.items() for network in networks
+)
+
+# 收款地址对应的环境变量
+RECEIVER_ADDRESS_ENV_VARS = {
+    'USDT': {
+        'ethereum': 'USDT_ETH_ADDRESS',
+        'bsc': 'USDT_BSC_ADDRESS',
+        'polygon': 'USDT_POLYGON_ADDRESS'
+    },
+    'USDC': {
+        'ethereum': 'USDC_ETH_ADDRESS',
+        'bsc': 'USDC_BSC_ADDRESS',
+        'polygon': 'USDC_POLYGON_ADDRESS'
+    }
+}
+
+# 网络到Moralis chain参数的映射
+CHAIN_MAPPING = {
+    'ethereum': 'eth',
+    'bsc': 'bsc',
+    'polygon': 'polygon'
+}
+
+# 各网络 JSON-RPC 节点地址对应的环境变量（批量查询交易回执时使用）
+RPC_URL_ENV_VARS = {
+    'ethereum': 'ETH_RPC_URL',
+    'bsc': 'BSC_RPC_URL',
+    'polygon': 'POLYGON_RPC_URL'
+}
+
+# 代币数量精度（6 位小数）及链上最小单位换算
+TOKEN_AMOUNT_QUANTUM = Decimal('0.000001')
+TOKEN_UNIT = Decimal('1000000')
+
+# 各网络的平均出块时间（秒），用于估算还需等待多久才能达到最小确认数
+BLOCK_TIME = {
+    'ethereum': 12,
+    'bsc': 3,
+    'polygon': 2
+}
+
+# HTTP 请求超时 (连接, 读取)：连接不上时 3 秒就放弃，不必等满整个读取超时
+HTTP_TIMEOUT = (3, 10)
+
+# 支付请求（订单）的有效期
+PAYMENT_REQUEST_TTL = timedelta(hours=24)
+
+# 地址交易历史最多翻页次数，防止异常的 cursor 导致无限请求
+ADDRESS_HISTORY_MAX_PAGES = 20
+
+# 批量检查支付时并发请求地址交易历史的线程数，不超过 Moralis 会话的连接池大小
+ADDRESS_HISTORY_WORKERS = 8
+
+# 各网络的最小确认数
+MIN_CONFIRMATIONS = {
+    'ethereum': 12,
+    'bsc': 15,
+    'polygon': 256
+}
+
+# 支持的代币和网络（只读，供前端展示）
+SUPPORTED_TOKENS = [
+    {
+        'symbol': 'USDT',
+        'name': 'Tether USD',
+        'networks': ['ethereum', 'bsc', 'polygon'],
+        'icon': '/icons/usdt.png',
+        'description': 'Most popular stablecoin'
+    },
+    {
+        'symbol': 'USDC',
+        'name': 'USD Coin',
+        'networks': ['ethereum', 'bsc', 'polygon'],
+        'icon': '/icons/usdc.png',
+        'description': 'Regulated stablecoin'
+    }
+]
+
+SUPPORTED_NETWORKS = [
+    {
+        'id': 'ethereum',
+        'name': 'Ethereum',
+        'icon': '/icons/eth.png',
+        'description': 'Most secure network',
+        'gas_fee': 'High'
+    },
+    {
+        'id': 'bsc',
+        'name': 'BNB Smart Chain',
+        'icon': '/icons/bnb.png',
+        'description': 'Fast and low cost',
+        'gas_fee': 'Low'
+    },
+    {
+        'id': 'polygon',
+        'name': 'Polygon',
+        'icon': '/icons/matic.png',
+        'description': 'Ethereum scaling solution',
+        'gas_fee': 'Very Low'
+    }
+]
+
+# 未配置收款地址时使用的占位地址
+PLACEHOLDER_RECEIVER_ADDRESS = '0x1234567890123456789012345678901234567890'
+
+
+def load_receiver_addresses() -> dict:
+    """从环境变量读取收款地址，未配置的为 None"""
+    return {
+        symbol: {network: os.getenv(env_var) for network, env_var in env_vars.items()}
+        for symbol, env_vars in RECEIVER_ADDRESS_ENV_VARS.items()
+    }
+
+
+# 收款地址在导入时读取一次，修改环境变量后需要重启服务
+RECEIVER_ADDRESSES = load_receiver_addresses()
+
+# 小写形式的收款地址，验证交易时直接与链上地址比较
+RECEIVER_ADDRESSES_LC = {
+    symbol: {network: address.lower() if address else None for network, address in addresses.items()}
+    for symbol, addresses in RECEIVER_ADDRESSES.items()
+}
+
+# 哪些收款地址未配置、会使用占位地址（启动时由 _validate_receiver_addresses 记录一次警告）
+RECEIVER_IS_PLACEHOLDER = {
+    symbol: {network: not address or address == PLACEHOLDER_RECEIVER_ADDRESS for network, address in addresses.items()}
+    for symbol, addresses in RECEIVER_ADDRESSES.items()
+}
+
+# 后台刷新过期代币价格的线程池
+_price_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='price-refresh')
+
 class CryptoPaymentService:
     """加密货币支付服务"""
+
+    # 代币价格缓存: (token_symbol, network) -> (price, fresh_until, stale_until)，时间为 time.monotonic()
+    # 稳定币价格几乎不变：fresh 期内直接返回缓存；stale 期内先返回旧价格，再在后台刷新；
+    # 超过 stale 期才同步请求 Moralis
+    _price_cache = {}
+    _price_cache_lock = threading.Lock()
+    _price_refreshing = set()
+    _price_refreshing_lock = threading.Lock()
+    _PRICE_TTL = getattr(settings, 'CRYPTO_PRICE_TTL', 60)
+    _PRICE_STALE_TTL = getattr(settings, 'CRYPTO_PRICE_STALE_TTL', 600)
+    # 后台预热价格缓存的间隔（秒），默认 0 不启动后台刷新线程，由部署方只在一个进程中开启
+    _PRICE_REFRESH_INTERVAL = getattr(settings, 'CRYPTO_PRICE_REFRESH_INTERVAL', 0)
+
+    # 支付验证结果缓存: (tx_hash, order_id) -> (result, expires_at)，时间为 time.monotonic()
+    # 验证通过的结果不会再变，一直缓存（LRU 淘汰）；未通过的结果只缓存几秒，挡住轮询时的重复请求
+    _verify_cache = OrderedDict()
+    _verify_cache_lock = threading.Lock()
+    _VERIFY_CACHE_SIZE = 10000
+    _VERIFY_FAILURE_TTL = 5
     
     def __init__(self):
         self.moralis_api_key = os.getenv('MORALIS_API_KEY')
@@ -19,76 +199,169 @@ class CryptoPaymentService:
         if not self.moralis_api_key:
             logger.error('MORALIS_API_KEY not found in environment variables')
             raise ValueError('MORALIS_API_KEY is required for crypto payments')
+
+        # 复用 keep-alive 连接池，避免每次请求 Moralis 都重新建立 TCP/TLS 连接；
+        # 429/5xx 由连接池自动退避重试（只对 GET 请求）
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[429, 502, 503, 504],
+                allowed_methods=['GET'],
+                raise_on_status=False
+            )
+        )
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'X-API-Key': self.moralis_api_key,
+            'Accept': 'application/json'
+        })
+
+        # 节点 JSON-RPC 请求使用单独的会话，不把 Moralis API Key 发给节点
+        self.rpc_session = requests.Session()
+        self.rpc_session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=3, pool_maxsize=10))
+        # 节点地址只在创建服务时读取一次环境变量
+        self.rpc_urls = {
+            network: url for network, env_var in RPC_URL_ENV_VARS.items()
+            if (url := os.getenv(env_var))
+        }
+
+        # 异步接口使用的 aiohttp 会话，在第一次使用时于当前事件循环中创建
+        self._aio_session = None
+        self._aio_loop = None
         
         # 验证收款地址配置
         self._validate_receiver_addresses()
+
+        # 开启预热的进程中，后台线程定期刷新所有支持的代币价格，用户请求不再承担缓存未命中的
+        # Moralis 延迟；进程退出或 Celery worker 关闭时停止
+        self._price_refresh_stop = threading.Event()
+        if self._PRICE_REFRESH_INTERVAL > 0:
+            threading.Thread(target=self._price_refresh_loop, name='price-warmer', daemon=True).start()
+            atexit.register(self.stop_price_refresher)
+            worker_process_shutdown.connect(self._on_worker_shutdown, weak=False)
     
     def _validate_receiver_addresses(self):
         """验证收款地址配置"""
-        required_addresses = [
-            'USDT_ETH_ADDRESS', 'USDT_BSC_ADDRESS', 'USDT_POLYGON_ADDRESS',
-            'USDC_ETH_ADDRESS', 'USDC_BSC_ADDRESS', 'USDC_POLYGON_ADDRESS'
+        missing_addresses = [
+            env_var
+            for symbol, env_vars in RECEIVER_ADDRESS_ENV_VARS.items()
+            for network, env_var in env_vars.items()
+            if RECEIVER_IS_PLACEHOLDER[symbol][network]
         ]
         
-        missing_addresses = []
-        for addr in required_addresses:
-            if not os.getenv(addr):
-                missing_addresses.append(addr)
-        
         if missing_addresses:
             logger.warning(f'Missing receiver addresses: {missing_addresses}')
             logger.warning('Using placeholder addresses. Please configure real addresses for production.')
     
-    def get_token_price(self, token_symbol: str, network: str = 'ethereum') -> Decimal:
-        """获取代币价格"""
+    def get_token_price(self, token_symbol: str, network: str = 'ethereum', force_refresh: bool = False) -> Decimal:
+        """获取代币价格（stale-while-revalidate 缓存）
+
+        force_refresh=True 时跳过缓存直接请求 Moralis，并用结果更新缓存
+        """
+        key = (token_symbol.upper(), network)
+        if key not in SUPPORTED_PAIRS:
+            raise ValueError(f'Token {token_symbol} not supported on network {network}')
+        if force_refresh:
+            price = self._fetch_token_price(token_symbol, network)
+            self._store_token_price(key, price)
+            return price
+        cached = self._price_cache.get(key)
+        if cached:
+            price, fresh_until, stale_until = cached
+            now = time.monotonic()
+            if now < fresh_until:
+                return price
+            if now < stale_until:
+                self._schedule_price_refresh(key, token_symbol, network)
+                return price
+
+        # 没有可用的缓存：加锁后再检查一次，并发请求只有一个会去请求 Moralis
+        with self._price_cache_lock:
+            cached = self._price_cache.get(key)
+            if cached and time.monotonic() < cached[2]:
+                return cached[0]
+            price = self._fetch_token_price(token_symbol, network)
+            self._store_token_price(key, price)
+            return price
+
+    def _price_refresh_loop(self):
+        """预热并定期刷新价格缓存，直到 stop_price_refresher 被调用"""
+        while not self._price_refresh_stop.is_set():
+            for key in SUPPORTED_PAIRS:
+                try:
+                    self._store_token_price(key, self._fetch_token_price(*key))
+                except Exception as e:
+                    logger.warning(f'Price warm-up failed for {key[0]} on {key[1]}: {e}')
+            self._price_refresh_stop.wait(self._PRICE_REFRESH_INTERVAL)
+
+    def stop_price_refresher(self):
+        """停止后台价格刷新线程"""
+        self._price_refresh_stop.set()
+
+    def _on_worker_shutdown(self, **kwargs):
+        """Celery worker 进程关闭时停止后台价格刷新线程"""
+        self.stop_price_refresher()
+
+    def _store_token_price(self, key, price: Decimal):
+        """写入价格缓存"""
+        now = time.monotonic()
+        self._price_cache[key] = (price, now + self._PRICE_TTL, now + self._PRICE_STALE_TTL)
+
+    def _schedule_price_refresh(self, key, token_symbol: str, network: str):
+        """提交后台刷新任务，同一个代币同时只刷新一次"""
+        with self._price_refreshing_lock:
+            if key in self._price_refreshing:
+                return
+            self._price_refreshing.add(key)
+        _price_refresh_executor.submit(self._refresh_token_price, key, token_symbol, network)
+
+    def _refresh_token_price(self, key, token_symbol: str, network: str):
+        """后台刷新代币价格，失败时保留旧价格"""
         try:
-            # 代币合约地址映射
-            token_addresses = {
-                'USDT': {
-                    'ethereum': '0xdac17f958d2ee523a2206206994597c13d831ec7',
-                    'bsc': '0x55d398326f99059ff775485246999027b3197955',
-                    'polygon': '0xc2132d05d31c914a87c6611c10748aeb04b58e8f'
-                },
-                'USDC': {
-                    'ethereum': '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48',
-                    'bsc': '0x8ac76a51cc950d9822d68b83fe1ad97b32cd580d',
-                    'polygon': '0x2791bca1f2de4661ed88a30c99a7a9449aa84174'
-                }
-            }
-            
-            token_address = token_addresses.get(token_symbol.upper(), {}).get(network)
-            if not token_address:
-                raise ValueError(f'Token {token_symbol} not supported on network {network}')
-            
-            # 网络到Moralis chain参数的映射
-            chain_mapping = {
-                'ethereum': 'eth',
-                'bsc': 'bsc',
-                'polygon': 'polygon'
-            }
-            
-            chain_param = chain_mapping.get(network, network)
-            
-            url = f"{self.base_url}/erc20/{token_address}/price"
-            params = {
-                'chain': chain_param,
-                'include': 'percent_change'
-            }
-            headers = {
-                'X-API-Key': self.moralis_api_key
-            }
+            self._store_token_price(key, self._fetch_token_price(token_symbol, network))
+        except Exception as e:
+            logger.warning(f'Background price refresh failed for {token_symbol} on {network}: {e}')
+        finally:
+            with self._price_refreshing_lock:
+                self._price_refreshing.discard(key)
+
+    def _token_price_request(self, token_symbol: str, network: str):
+        """构造 Moralis 代币价格请求的 URL 和参数"""
+        # 调用方已经用 SUPPORTED_PAIRS 检查过代币和网络
+        token_address = TOKEN_ADDRESSES[token_symbol.upper()][network]
+        
+        chain_param = CHAIN_MAPPING.get(network, network)
+        
+        url = f"{self.base_url}/erc20/{token_address}/price"
+        params = {
+            'chain': chain_param,
+            'include': 'percent_change'
+        }
+        return url, params
+
+    def _parse_token_price(self, data: dict, token_symbol: str, network: str) -> Decimal:
+        """从 Moralis 响应中取出代币价格"""
+        price = Decimal(str(data.get('usdPrice', 0)))
+        
+        if price <= 0:
+            raise ValueError(f'Invalid token price: {price}')
+        
+        logger.info('Token price for %s on %s: $%s', token_symbol, network, price)
+        return price
+
+    def _fetch_token_price(self, token_symbol: str, network: str) -> Decimal:
+        """从 Moralis 获取代币价格"""
+        try:
+            url, params = self._token_price_request(token_symbol, network)
             
-            response = requests.get(url, params=params, headers=headers, timeout=10)
+            response = self.session.get(url, params=params, timeout=HTTP_TIMEOUT)
             response.raise_for_status()
             
-            data = response.json()
-            price = Decimal(str(data.get('usdPrice', 0)))
-            
-            if price <= 0:
-                raise ValueError(f'Invalid token price: {price}')
-            
-            logger.info(f'Token price for {token_symbol} on {network}: ${price}')
-            return price
+            return self._parse_token_price(orjson.loads(response.content), token_symbol, network)
             
         except requests.exceptions.RequestException as e:
             logger.error(f'Network error getting token price for {token_symbol}: {e}')
@@ -100,49 +373,23 @@ class CryptoPaymentService:
     def create_payment_request(self, order_id: str, amount_usd: Decimal, token_symbol: str, network: str = 'ethereum') -> dict:
         """创建支付请求"""
         try:
+            if (token_symbol.upper(), network) not in SUPPORTED_PAIRS:
+                raise ValueError(f'Token {token_symbol} not supported on network {network}')
+            
             # 获取代币价格
             token_price = self.get_token_price(token_symbol, network)
             
             # 计算需要的代币数量（向上取整到6位小数）
-            token_amount = (amount_usd / token_price).quantize(Decimal('0.000001'), rounding='ROUND_UP')
-            
-            # 代币合约地址映射
-            token_addresses = {
-                'USDT': {
-                    'ethereum': '0xdac17f958d2ee523a2206206994597c13d831ec7',
-                    'bsc': '0x55d398326f99059ff775485246999027b3197955',
-                    'polygon': '0xc2132d05d31c914a87c6611c10748aeb04b58e8f'
-                },
-                'USDC': {
-                    'ethereum': '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48',
-                    'bsc': '0x8ac76a51cc950d9822d68b83fe1ad97b32cd580d',
-                    'polygon': '0x2791bca1f2de4661ed88a30c99a7a9449aa84174'
-                }
-            }
+            token_amount = (amount_usd / token_price).quantize(TOKEN_AMOUNT_QUANTUM, rounding=ROUND_UP)
             
-            token_address = token_addresses.get(token_symbol.upper(), {}).get(network)
-            if not token_address:
-                raise ValueError(f'Token {token_symbol} not supported on network {network}')
-            
-            # 获取收款地址
-            receiver_addresses = {
-                'USDT': {
-                    'ethereum': os.getenv('USDT_ETH_ADDRESS', '0x1234567890123456789012345678901234567890'),
-                    'bsc': os.getenv('USDT_BSC_ADDRESS', '0x1234567890123456789012345678901234567890'),
-                    'polygon': os.getenv('USDT_POLYGON_ADDRESS', '0x1234567890123456789012345678901234567890')
-                },
-                'USDC': {
-                    'ethereum': os.getenv('USDC_ETH_ADDRESS', '0x1234567890123456789012345678901234567890'),
-                    'bsc': os.getenv('USDC_BSC_ADDRESS', '0x1234567890123456789012345678901234567890'),
-                    'polygon': os.getenv('USDC_POLYGON_ADDRESS', '0x1234567890123456789012345678901234567890')
-                }
-            }
-            
-            receiver_address = receiver_addresses.get(token_symbol.upper(), {}).get(network)
+            token_address = TOKEN_ADDRESSES[token_symbol.upper()][network]
             
-            # 检查是否为占位符地址
-            if receiver_address == '0x1234567890123456789012345678901234567890':
-                logger.warning(f'Using placeholder address for {token_symbol} on {network}')
+            # 获取收款地址（未配置时使用占位地址，启动时已经记录过警告）
+            symbol = token_symbol.upper()
+            if RECEIVER_IS_PLACEHOLDER[symbol][network]:
+                receiver_address = PLACEHOLDER_RECEIVER_ADDRESS
+            else:
+                receiver_address = RECEIVER_ADDRESSES[symbol][network]
             
             payment_request = {
                 'order_id': order_id,
@@ -153,28 +400,78 @@ class CryptoPaymentService:
                 'amount_usd': float(amount_usd),
                 'token_amount': float(token_amount),
                 'token_price': float(token_price),
-                'expires_at': (datetime.now() + timedelta(hours=24)).isoformat(),
+                'expires_at': (datetime.now(dt_timezone.utc) + PAYMENT_REQUEST_TTL).isoformat(),
                 'payment_url': f"crypto://{network}/{token_address}/{receiver_address}?amount={token_amount}&order_id={order_id}",
                 'min_confirmations': self._get_min_confirmations(network)
             }
             
-            logger.info(f'Created payment request: {payment_request}')
+            logger.info('Created payment request: %s', payment_request)
             return payment_request
             
         except Exception as e:
             logger.error(f'Error creating payment request: {e}')
             raise
     
-    def _get_min_confirmations(self, network: str) -> int:
+    @staticmethod
+    def _get_min_confirmations(network: str) -> int:
         """获取最小确认数"""
-        confirmations = {
-            'ethereum': 12,
-            'bsc': 15,
-            'polygon': 256
-        }
-        return confirmations.get(network, 12)
+        return MIN_CONFIRMATIONS.get(network, 12)
     
+    def _transaction_request(self, tx_hash: str, network: str):
+        """构造 Moralis 交易查询请求的 URL 和参数"""
+        # 使用Moralis API验证交易
+        chain_param = CHAIN_MAPPING.get(network, network)
+        
+        # 使用正确的API端点获取交易信息
+        # Moralis API v2: /api/v2/transaction/{tx_hash}?chain={chain}
+        url = f"{self.base_url}/transaction/{tx_hash}"
+        params = {
+            'chain': chain_param
+        }
+        
+        logger.info(f'Fetching transaction data from Moralis: {url} with chain: {chain_param}')
+        return url, params
+
+    def _get_cached_verification(self, key):
+        """读取缓存的验证结果，过期或不存在时返回 None"""
+        with self._verify_cache_lock:
+            cached = self._verify_cache.get(key)
+            if cached is None:
+                return None
+            result, expires_at = cached
+            if time.monotonic() >= expires_at:
+                del self._verify_cache[key]
+                return None
+            self._verify_cache.move_to_end(key)
+            return result
+
+    def _cache_verification(self, key, result: dict):
+        """缓存验证结果
+
+        确认数不足的结果带有 retry_after_seconds，在此之前重复验证结果不会变化，按这个时间缓存
+        """
+        if result.get('verified'):
+            ttl = float('inf')
+        else:
+            ttl = result.get('retry_after_seconds', self._VERIFY_FAILURE_TTL)
+        with self._verify_cache_lock:
+            self._verify_cache[key] = (result, time.monotonic() + ttl)
+            self._verify_cache.move_to_end(key)
+            if len(self._verify_cache) > self._VERIFY_CACHE_SIZE:
+                self._verify_cache.popitem(last=False)
+
     def verify_payment(self, order_id: str, token_symbol: str, network: str = 'ethereum', tx_hash: str = None) -> dict:
+        """验证支付（同一笔交易和订单的结果会被缓存）"""
+        if not tx_hash:
+            return self._verify_payment(order_id, token_symbol, network, tx_hash)
+        key = (tx_hash, order_id)
+        result = self._get_cached_verification(key)
+        if result is None:
+            result = self._verify_payment(order_id, token_symbol, network, tx_hash)
+            self._cache_verification(key, result)
+        return result
+
+    def _verify_payment(self, order_id: str, token_symbol: str, network: str = 'ethereum', tx_hash: str = None) -> dict:
         """验证支付"""
         try:
             if not tx_hash:
@@ -185,28 +482,8 @@ class CryptoPaymentService:
             
             logger.info(f'Starting payment verification for order {order_id}, tx_hash: {tx_hash}, token: {token_symbol}, network: {network}')
             
-            # 使用Moralis API验证交易
-            # 网络到Moralis chain参数的映射
-            chain_mapping = {
-                'ethereum': 'eth',
-                'bsc': 'bsc',
-                'polygon': 'polygon'
-            }
-            
-            chain_param = chain_mapping.get(network, network)
-            
-            # 使用正确的API端点获取交易信息
-            # Moralis API v2: /api/v2/transaction/{tx_hash}?chain={chain}
-            url = f"{self.base_url}/transaction/{tx_hash}"
-            params = {
-                'chain': chain_param
-            }
-            headers = {
-                'X-API-Key': self.moralis_api_key
-            }
-            
-            logger.info(f'Fetching transaction data from Moralis: {url} with chain: {chain_param}')
-            response = requests.get(url, params=params, headers=headers, timeout=10)
+            url, params = self._transaction_request(tx_hash, network)
+            response = self.session.get(url, params=params, timeout=HTTP_TIMEOUT)
             
             if response.status_code != 200:
                 logger.error(f'Moralis API error: {response.status_code} - {response.text}')
@@ -217,8 +494,8 @@ class CryptoPaymentService:
             
             response.raise_for_status()
             
-            transaction_data = response.json()
-            logger.info(f'Transaction data received: {transaction_data}')
+            transaction_data = orjson.loads(response.content)
+            logger.info('Transaction data received: %s', transaction_data)
             
             # 检查交易数据格式
             if not isinstance(transaction_data, dict):
@@ -231,7 +508,7 @@ class CryptoPaymentService:
             # 验证交易详情
             verification_result = self._validate_transaction(transaction_data, order_id, token_symbol, network)
             
-            logger.info(f'Payment verification result: {verification_result}')
+            logger.info('Payment verification result: %s', verification_result)
             return verification_result
             
         except requests.exceptions.RequestException as e:
@@ -247,11 +524,263 @@ class CryptoPaymentService:
                 'message': f'Verification error: {str(e)}'
             }
     
-    def _validate_transaction(self, transaction_data: dict, order_id: str, token_symbol: str, network: str) -> dict:
-        """验证交易详情"""
+    def _get_aio_session(self) -> aiohttp.ClientSession:
+        """获取当前事件循环的 aiohttp 会话，所有异步请求共用一个连接池"""
+        loop = asyncio.get_running_loop()
+        if self._aio_session is None or self._aio_session.closed or self._aio_loop is not loop:
+            self._discard_aio_session()
+            self._aio_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=10),
+                headers={
+                    'X-API-Key': self.moralis_api_key,
+                    'Accept': 'application/json'
+                }
+            )
+            self._aio_loop = loop
+        return self._aio_session
+
+    def _discard_aio_session(self):
+        """释放绑定在其他事件循环上的旧会话
+
+        旧事件循环仍在（其他线程中）运行时在它上面关闭会话；已经停止或关闭的事件循环
+        无法再执行关闭协程，只能把连接器从会话上分离。自己创建事件循环的调用方应在
+        事件循环结束前调用 close_aio_session
+        """
+        stale, stale_loop = self._aio_session, self._aio_loop
+        self._aio_session = None
+        self._aio_loop = None
+        if stale is None or stale.closed:
+            return
+        if stale_loop is not None and stale_loop.is_running():
+            asyncio.run_coroutine_threadsafe(stale.close(), stale_loop)
+        else:
+            stale.detach()
+
+    async def close_aio_session(self):
+        """关闭 aiohttp 会话"""
+        if self._aio_session is not None and not self._aio_session.closed:
+            await self._aio_session.close()
+        self._aio_session = None
+        self._aio_loop = None
+
+    async def get_token_price_async(self, token_symbol: str, network: str = 'ethereum') -> Decimal:
+        """获取代币价格（异步版本，与同步版本共用价格缓存）"""
+        key = (token_symbol.upper(), network)
+        if key not in SUPPORTED_PAIRS:
+            raise ValueError(f'Token {token_symbol} not supported on network {network}')
+        cached = self._price_cache.get(key)
+        if cached:
+            price, fresh_until, stale_until = cached
+            now = time.monotonic()
+            if now < fresh_until:
+                return price
+            if now < stale_until:
+                self._schedule_price_refresh(key, token_symbol, network)
+                return price
+
+        try:
+            url, params = self._token_price_request(token_symbol, network)
+            async with self._get_aio_session().get(url, params=params) as response:
+                response.raise_for_status()
+                data = orjson.loads(await response.read())
+            price = self._parse_token_price(data, token_symbol, network)
+            self._store_token_price(key, price)
+            return price
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f'Network error getting token price for {token_symbol}: {e}')
+            raise
+        except Exception as e:
+            logger.error(f'Error getting token price for {token_symbol}: {e}')
+            raise
+
+    async def verify_payment_async(self, order_id: str, token_symbol: str, network: str = 'ethereum', tx_hash: str = None) -> dict:
+        """验证支付（异步版本），多个订单可以在同一个事件循环中并发验证"""
+        if not tx_hash:
+            return await self._verify_payment_async(order_id, token_symbol, network, tx_hash)
+        key = (tx_hash, order_id)
+        result = self._get_cached_verification(key)
+        if result is None:
+            result = await self._verify_payment_async(order_id, token_symbol, network, tx_hash)
+            self._cache_verification(key, result)
+        return result
+
+    async def _verify_payment_async(self, order_id: str, token_symbol: str, network: str = 'ethereum', tx_hash: str = None) -> dict:
+        """验证支付（异步版本）"""
+        try:
+            if not tx_hash:
+                return {
+                    'verified': False,
+                    'message': 'Transaction hash required for verification'
+                }
+            
+            logger.info(f'Starting payment verification for order {order_id}, tx_hash: {tx_hash}, token: {token_symbol}, network: {network}')
+            
+            url, params = self._transaction_request(tx_hash, network)
+            async with self._get_aio_session().get(url, params=params) as response:
+                if response.status != 200:
+                    text = await response.text()
+                    logger.error(f'Moralis API error: {response.status} - {text}')
+                    return {
+                        'verified': False,
+                        'message': f'Moralis API error: {response.status} - {text}'
+                    }
+                transaction_data = orjson.loads(await response.read())
+            
+            # 检查交易数据格式
+            if not isinstance(transaction_data, dict):
+                logger.error(f'Invalid transaction data format: {type(transaction_data)}')
+                return {
+                    'verified': False,
+                    'message': f'Invalid transaction data format: {type(transaction_data)}'
+                }
+            
+            # _validate_transaction 需要查询订单，ORM 调用放到线程中执行
+            verification_result = await sync_to_async(self._validate_transaction)(
+                transaction_data, order_id, token_symbol, network
+            )
+            
+            logger.info('Payment verification result: %s', verification_result)
+            return verification_result
+            
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f'Network error verifying payment: {e}')
+            return {
+                'verified': False,
+                'message': f'Network error: {str(e)}'
+            }
+        except Exception as e:
+            logger.error(f'Error verifying payment: {e}')
+            return {
+                'verified': False,
+                'message': f'Verification error: {str(e)}'
+            }
+
+    async def verify_payments_batch(self, jobs: list, concurrency: int = 16) -> list:
+        """并发验证多个支付，jobs 为 verify_payment_async 的关键字参数列表
+
+        同时进行的请求数不超过 concurrency，避免触发 Moralis 限流；
+        单个任务的异常转换成与同步接口相同的失败结果
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(job):
+            async with semaphore:
+                return await self.verify_payment_async(**job)
+
+        results = await asyncio.gather(*[run(job) for job in jobs], return_exceptions=True)
+        return [
+            {'verified': False, 'message': f'Verification error: {str(result)}'}
+            if isinstance(result, BaseException) else result
+            for result in results
+        ]
+
+    def verify_payments_bulk(self, jobs: list, concurrency: int = 16) -> list:
+        """在同步代码（定时任务、管理命令）中并发验证多个支付"""
+        async def run():
+            try:
+                return await self.verify_payments_batch(jobs, concurrency)
+            finally:
+                await self.close_aio_session()
+
+        return asyncio.run(run())
+
+    def verify_payments_rpc_batch(self, jobs: list, network: str = 'ethereum') -> list:
+        """用一个 JSON-RPC 批量请求查询同一网络上多笔交易的回执并验证
+
+        jobs 为 {'order_id', 'token_symbol', 'tx_hash'} 列表。所有 eth_getTransactionReceipt
+        和一个 eth_blockNumber（用于计算确认数）放在同一个 HTTP 请求里；
+        未配置该网络的节点地址时退回到 Moralis 并发验证
+        """
+        rpc_url = self.rpc_urls.get(network)
+        if not rpc_url:
+            return self.verify_payments_bulk([{**job, 'network': network} for job in jobs])
+
+        results = [None] * len(jobs)
+        batch = [{'jsonrpc': '2.0', 'id': 0, 'method': 'eth_blockNumber', 'params': []}]
+        for i, job in enumerate(jobs):
+            if not job.get('tx_hash'):
+                results[i] = {
+                    'verified': False,
+                    'message': 'Transaction hash required for verification'
+                }
+                continue
+            batch.append({'jsonrpc': '2.0', 'id': i + 1, 'method': 'eth_getTransactionReceipt', 'params': [job['tx_hash']]})
+
+        try:
+            response = self.rpc_session.post(rpc_url, json=batch, timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+            replies = {reply.get('id'): reply for reply in orjson.loads(response.content)}
+        except (requests.exceptions.RequestException, ValueError, AttributeError) as e:
+            logger.error(f'RPC batch error on {network}: {e}')
+            return [result or {'verified': False, 'message': f'Network error: {str(e)}'} for result in results]
+
+        latest_block = int(replies.get(0, {}).get('result') or '0x0', 16)
+        for i, job in enumerate(jobs):
+            if results[i] is not None:
+                continue
+            reply = replies.get(i + 1, {})
+            receipt = reply.get('result')
+            if not receipt:
+                error = reply.get('error')
+                results[i] = {
+                    'verified': False,
+                    'message': f'RPC error: {error}' if error else 'Transaction not found or pending'
+                }
+                continue
+            transaction_data = self._receipt_to_transaction_data(receipt, latest_block)
+            results[i] = self._validate_transaction(transaction_data, job['order_id'], job['token_symbol'], network)
+
+        return results
+
+    @staticmethod
+    def _receipt_to_transaction_data(receipt: dict, latest_block: int) -> dict:
+        """把 JSON-RPC 交易回执转换成 _validate_transaction 使用的 Moralis 字段格式"""
+        block_number = int(receipt.get('blockNumber') or '0x0', 16)
+        return {
+            'hash': receipt.get('transactionHash'),
+            'from_address': receipt.get('from'),
+            'to_address': receipt.get('to'),
+            'receipt_status': str(int(receipt.get('status') or '0x0', 16)),
+            'confirmations': latest_block - block_number + 1 if block_number and latest_block >= block_number else 0,
+            'logs': [
+                {
+                    'topic0': (log.get('topics') or [None])[0],
+                    'topics': log.get('topics', []),
+                    'data': log.get('data', '')
+                }
+                for log in receipt.get('logs', [])
+            ]
+        }
+
+    def _expected_token_amount(self, order, token_symbol: str, network: str) -> Decimal:
+        """订单应支付的代币数量：优先使用创建订单时记录的数量"""
+        # 从订单的payment_info中获取创建时计算的代币数量
+        payment_info = order.payment_info
+        if isinstance(payment_info, str):
+            payment_info = json.loads(payment_info)
+        
+        expected_token_amount = Decimal(str(payment_info.get('token_amount', 0)))
+        
+        # 如果订单中没有记录代币数量，则使用当前价格计算（兼容旧订单）
+        if expected_token_amount == 0:
+            logger.warning(f'No token amount recorded in order {order.order_id}, using current price calculation')
+            # 对账旧订单时使用实时价格，不用可能已过期的缓存
+            current_token_price = self.get_token_price(token_symbol, network, force_refresh=True)
+            expected_token_amount = (order.amount / current_token_price).quantize(TOKEN_AMOUNT_QUANTUM, rounding=ROUND_UP)
+        return expected_token_amount
+
+    def _validate_transaction(self, transaction_data: dict, order_id: str, token_symbol: str, network: str,
+                              expected_token_amount: Decimal = None) -> dict:
+        """验证交易详情
+
+        expected_token_amount 为空时从数据库读取订单计算期望的代币数量
+        """
         try:
             logger.info(f'Validating transaction for order {order_id}')
-            logger.info(f'Transaction data keys: {list(transaction_data.keys())}')
+            if logger.isEnabledFor(logging.INFO):
+                logger.info('Transaction data keys: %s', list(transaction_data.keys()))
             
             # 检查交易状态
             receipt_status = transaction_data.get('receipt_status')
@@ -268,7 +797,7 @@ class CryptoPaymentService:
             min_confirmations = self._get_min_confirmations(network)
             
             logger.info(f'Confirmation check - Required: {min_confirmations}, Current: {confirmations}')
-            logger.info(f'Full transaction data: {transaction_data}')
+            logger.info('Full transaction data: %s', transaction_data)
             
             # 对于测试环境或开发环境，可以放宽确认数要求
             if confirmations < min_confirmations:
@@ -284,26 +813,15 @@ class CryptoPaymentService:
                             'message': f'Transaction failed or pending. Status: {receipt_status}'
                         }
                 else:
+                    # 告诉调用方大约多少秒后再来验证，避免盲目轮询
                     return {
                         'verified': False,
-                        'message': f'Insufficient confirmations. Required: {min_confirmations}, Current: {confirmations}'
+                        'message': f'Insufficient confirmations. Required: {min_confirmations}, Current: {confirmations}',
+                        'retry_after_seconds': (min_confirmations - confirmations) * BLOCK_TIME.get(network, 12)
                     }
             
             # 检查接收地址
-            receiver_addresses = {
-                'USDT': {
-                    'ethereum': os.getenv('USDT_ETH_ADDRESS'),
-                    'bsc': os.getenv('USDT_BSC_ADDRESS'),
-                    'polygon': os.getenv('USDT_POLYGON_ADDRESS')
-                },
-                'USDC': {
-                    'ethereum': os.getenv('USDC_ETH_ADDRESS'),
-                    'bsc': os.getenv('USDC_BSC_ADDRESS'),
-                    'polygon': os.getenv('USDC_POLYGON_ADDRESS')
-                }
-            }
-            
-            expected_receiver = receiver_addresses.get(token_symbol.upper(), {}).get(network)
+            expected_receiver = RECEIVER_ADDRESSES_LC.get(token_symbol.upper(), {}).get(network)
             
             # 对于ERC20代币，需要从交易日志中获取真正的收款地址
             # to_address 是代币合约地址，不是收款地址
@@ -321,8 +839,8 @@ class CryptoPaymentService:
                             to_address = topics[2]
                             if to_address.startswith('0x'):
                                 to_address = to_address[2:]  # 移除0x前缀
-                            # 补齐到40个字符
-                            to_address = '0x' + to_address.zfill(40)
+                            # topic 是 32 字节（64 个十六进制字符），地址是最后 20 字节；不足 40 个字符时补齐
+                            to_address = '0x' + to_address.zfill(40)[-40:]
                             actual_receiver = to_address
                             logger.info(f'Found receiver address from Transfer event: {actual_receiver}')
                             break
@@ -340,11 +858,12 @@ class CryptoPaymentService:
             logger.info(f'Address check - Token: {token_symbol}, Network: {network}')
             logger.info(f'Expected receiver: {expected_receiver}')
             logger.info(f'Actual receiver: {actual_receiver}')
-            logger.info(f'Configured addresses: {receiver_addresses}')
+            logger.info('Configured addresses: %s', RECEIVER_ADDRESSES)
             
             if expected_receiver and actual_receiver:
-                if expected_receiver.lower() != actual_receiver.lower():
-                    logger.warning(f'Address mismatch - Expected: {expected_receiver.lower()}, Actual: {actual_receiver.lower()}')
+                actual_receiver = actual_receiver.lower()
+                if expected_receiver != actual_receiver:
+                    logger.warning(f'Address mismatch - Expected: {expected_receiver}, Actual: {actual_receiver}')
                     return {
                         'verified': False,
                         'message': f'Receiver address mismatch. Expected: {expected_receiver}, Actual: {actual_receiver}'
@@ -366,22 +885,10 @@ class CryptoPaymentService:
             # 从数据库获取订单信息以获取期望的金额
             from user.models import MembershipOrder
             try:
-                order = MembershipOrder.objects.get(order_id=order_id)
-                expected_amount = Decimal(str(order.amount))
-                
-                # 从订单的payment_info中获取创建时计算的代币数量
-                payment_info = order.payment_info
-                if isinstance(payment_info, str):
-                    import json
-                    payment_info = json.loads(payment_info)
-                
-                expected_token_amount = Decimal(str(payment_info.get('token_amount', 0)))
-                
-                # 如果订单中没有记录代币数量，则使用当前价格计算（兼容旧订单）
-                if expected_token_amount == 0:
-                    logger.warning(f'No token amount recorded in order {order_id}, using current price calculation')
-                    current_token_price = self.get_token_price(token_symbol, network)
-                    expected_token_amount = (expected_amount / current_token_price).quantize(Decimal('0.000001'), rounding='ROUND_UP')
+                # 批量检查时调用方已经为订单算好期望的代币数量，不再逐笔交易查询订单和价格
+                if expected_token_amount is None:
+                    order = MembershipOrder.objects.get(order_id=order_id)
+                    expected_token_amount = self._expected_token_amount(order, token_symbol, network)
                 
                 logger.info(f'Using expected token amount from order: {expected_token_amount} {token_symbol}')
                 
@@ -401,7 +908,7 @@ class CryptoPaymentService:
                                     amount_hex = data[2:]  # 移除0x前缀
                                     amount_decimal = int(amount_hex, 16)
                                     # USDT有6位小数
-                                    actual_token_amount = Decimal(amount_decimal) / Decimal('1000000')
+                                    actual_token_amount = Decimal(amount_decimal) / TOKEN_UNIT
                                     logger.info(f'Found token amount from Transfer event: {actual_token_amount}')
                                     break
                                 except (ValueError, IndexError) as e:
@@ -414,7 +921,7 @@ class CryptoPaymentService:
                         try:
                             amount_hex = input_data[74:138]  # 跳过方法签名和地址参数
                             amount_decimal = int(amount_hex, 16)
-                            actual_token_amount = Decimal(amount_decimal) / Decimal('1000000')
+                            actual_token_amount = Decimal(amount_decimal) / TOKEN_UNIT
                             logger.info(f'Found token amount from input data: {actual_token_amount}')
                         except (ValueError, IndexError) as e:
                             logger.warning(f'Failed to parse amount from input data: {e}')
@@ -464,48 +971,219 @@ class CryptoPaymentService:
     
     def get_supported_tokens(self) -> list:
         """获取支持的代币列表"""
-        return [
-            {
-                'symbol': 'USDT',
-                'name': 'Tether USD',
-                'networks': ['ethereum', 'bsc', 'polygon'],
-                'icon': '/icons/usdt.png',
-                'description': 'Most popular stablecoin'
-            },
-            {
-                'symbol': 'USDC',
-                'name': 'USD Coin',
-                'networks': ['ethereum', 'bsc', 'polygon'],
-                'icon': '/icons/usdc.png',
-                'description': 'Regulated stablecoin'
-            }
-        ]
+        return SUPPORTED_TOKENS
     
     def get_supported_networks(self) -> list:
         """获取支持的网络列表"""
-        return [
-            {
-                'id': 'ethereum',
-                'name': 'Ethereum',
-                'icon': '/icons/eth.png',
-                'description': 'Most secure network',
-                'gas_fee': 'High'
-            },
-            {
-                'id': 'bsc',
-                'name': 'BNB Smart Chain',
-                'icon': '/icons/bnb.png',
-                'description': 'Fast and low cost',
-                'gas_fee': 'Low'
-            },
-            {
-                'id': 'polygon',
-                'name': 'Polygon',
-                'icon': '/icons/matic.png',
-                'description': 'Ethereum scaling solution',
-                'gas_fee': 'Very Low'
+        return SUPPORTED_NETWORKS
+
+    def _parse_order_payment_info(self, order):
+        """从订单的 payment_info 中取出 (token_symbol, network, receiver_address, submitted_tx_hash)
+
+        submitted_tx_hash 为用户提交过、但当时确认数不足的交易哈希，没有时为 None；
+
+        返回 (info, error)，解析失败时 info 为 None、error 为要返回给调用方的结果
+        """
+        payment_info = order.payment_info
+        if not payment_info:
+            return None, {
+                'verified': False,
+                'message': 'Payment info not found'
+            }
+
+        # 确保payment_info是字典
+        if isinstance(payment_info, str):
+            try:
+                payment_info = json.loads(payment_info)
+            except (json.JSONDecodeError, TypeError):
+                return None, {
+                    'verified': False,
+                    'message': 'Invalid payment info format'
+                }
+
+        if not isinstance(payment_info, dict):
+            return None, {
+                'verified': False,
+                'message': 'Payment info is not a valid dictionary'
             }
-        ]
+
+        receiver_address = payment_info.get('receiver_address')
+        if not receiver_address:
+            return None, {
+                'verified': False,
+                'message': 'Receiver address not found'
+            }
+
+        return (
+            payment_info.get('token_symbol', 'USDT'),
+            payment_info.get('network', 'ethereum'),
+            receiver_address,
+            payment_info.get('submitted_tx_hash'),
+        ), None
+
+    def _fetch_address_history(self, network: str, receiver_address: str) -> list:
+        """使用Moralis API获取收款地址最近一个支付有效期内的交易"""
+        url = f"{self.base_url}/{receiver_address}"
+        now = datetime.now(dt_timezone.utc)
+        params = {
+            'chain': CHAIN_MAPPING.get(network, network),
+            'from_date': (now - PAYMENT_REQUEST_TTL).isoformat(),
+            'to_date': now.isoformat()
+        }
+
+        # Moralis 分页返回 {"result": [...], "cursor": ...}，沿 cursor 取完整个时间窗口
+        transactions = []
+        for _ in range(ADDRESS_HISTORY_MAX_PAGES):
+            response = self.session.get(url, params=params, timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+
+            data = orjson.loads(response.content)
+            transactions.extend(data.get('result') or [])
+            cursor = data.get('cursor')
+            if not cursor:
+                break
+            params['cursor'] = cursor
+        else:
+            logger.warning(f'Address history for {receiver_address} on {network} truncated after {ADDRESS_HISTORY_MAX_PAGES} pages')
+
+        return transactions
+
+    def complete_order_payment(self, order_pk: int, tx_hash: str, verification_result: dict):
+        """把已验证支付的订单标记为已支付，并激活会员、发放积分奖励
+
+        在事务中锁定订单后再检查一次状态，订单已被其他请求处理、或交易哈希已被其他订单使用时
+        返回 None；成功时返回 (order, user, points_awarded)
+        """
+        from user.models import MembershipOrder, PointsTransaction, User
+
+        with transaction.atomic():
+            order = MembershipOrder.objects.select_for_update().select_related('plan').get(pk=order_pk)
+            if order.status != 'pending':
+                return None
+            if MembershipOrder.objects.filter(status='paid', tx_hash=tx_hash).exists():
+                logger.warning(f'Transaction hash {tx_hash} has already been used, order {order.order_id} not confirmed')
+                return None
+
+            now = timezone.now()
+            # 确保 payment_info 是字典格式
+            if isinstance(order.payment_info, str):
+                payment_info = json.loads(order.payment_info)
+            else:
+                payment_info = order.payment_info or {}
+            payment_info['tx_hash'] = tx_hash
+            payment_info['verification_result'] = verification_result
+
+            order.status = 'paid'
+            order.paid_at = now
+            order.payment_info = payment_info
+            order.tx_hash = tx_hash
+            order.save()
+
+            # 激活会员
+            user = User.objects.select_for_update().get(pk=order.user_id)
+            if user.premium_expires_at and user.premium_expires_at > now:
+                # 如果会员未过期，延长会员时间
+                user.premium_expires_at += timedelta(days=order.plan.duration_days)
+            else:
+                # 如果会员已过期或从未购买过，设置新的到期时间
+                user.premium_expires_at = now + timedelta(days=order.plan.duration_days)
+            user.is_premium = True
+
+            # 计算积分奖励（1:10比例）
+            points_to_award = int(order.amount * 10)
+            user.points += points_to_award
+            user.save()
+
+            # 记录积分交易
+            PointsTransaction.objects.create(
+                user=user,
+                transaction_type='earn',
+                amount=points_to_award,
+                reason='premium_purchase',
+                description=f'会员购买奖励 - 订单 {order.order_id}'
+            )
+
+        return order, user, points_to_award
+
+    @staticmethod
+    def _paid_tx_hashes(transactions: list) -> set:
+        """返回交易列表中已经用于确认其他订单的交易哈希
+
+        地址交易历史覆盖整个支付有效期，之前批次确认过订单的交易仍在其中，
+        必须排除，否则同一笔交易可以再确认一个金额相同的待支付订单
+        """
+        from user.models import MembershipOrder
+
+        hashes = {tx.get('hash') for tx in transactions if tx.get('hash')}
+        if not hashes:
+            return set()
+        return set(
+            MembershipOrder.objects.filter(status='paid', tx_hash__in=hashes).values_list('tx_hash', flat=True)
+        )
+
+    def _match_order_payment(self, order, transactions: list, token_symbol: str,
+                             network: str, receiver_address: str, used_hashes=None) -> dict:
+        """在地址交易历史中查找与订单匹配的支付，找到则确认订单并激活会员
+
+        used_hashes 为已经被其他订单认领的交易哈希（包括之前已支付的订单和同一批次中
+        刚确认的订单），避免一笔交易确认多个订单
+        """
+        receiver_lc = receiver_address.lower()
+        expected_token_amount = None
+        for tx in transactions:
+            # 检查是否是指向收款地址的交易
+            if tx.get('to_address', '').lower() != receiver_lc:
+                continue
+            tx_hash = tx.get('hash')
+            if used_hashes is not None and tx_hash in used_hashes:
+                continue
+
+            # 期望的代币数量每个订单只算一次（旧订单需要请求实时价格），没有候选交易时不计算
+            if expected_token_amount is None:
+                expected_token_amount = self._expected_token_amount(order, token_symbol, network)
+
+            # 验证交易详情
+            verification_result = self._validate_transaction(
+                tx, order.order_id, token_symbol, network, expected_token_amount
+            )
+
+            if verification_result.get('verified'):
+                # 与用户提交交易哈希的验证共用确认逻辑
+                if self.complete_order_payment(order.pk, tx_hash, verification_result) is None:
+                    order.refresh_from_db(fields=['status', 'tx_hash'])
+                    if order.status == 'pending':
+                        # 交易已被其他订单使用，继续找下一笔
+                        if used_hashes is not None:
+                            used_hashes.add(tx_hash)
+                        continue
+                    if order.status == 'paid':
+                        return {
+                            'verified': True,
+                            'message': 'Payment already confirmed',
+                            'status': 'confirmed',
+                            'transaction_hash': order.tx_hash
+                        }
+                    return {
+                        'verified': False,
+                        'message': f'Order is {order.status}',
+                        'status': order.status
+                    }
+                if used_hashes is not None:
+                    used_hashes.add(tx_hash)
+
+                logger.info(f'Payment auto-verified for order {order.order_id}: {tx_hash}')
+                return {
+                    'verified': True,
+                    'message': 'Payment auto-verified',
+                    'status': 'confirmed',
+                    'transaction_hash': tx_hash
+                }
+
+        return {
+            'verified': False,
+            'message': 'No matching payment found',
+            'status': 'pending'
+        }
 
     def auto_check_payment(self, order_id: str) -> dict:
         """自动检查支付状态"""
@@ -529,92 +1207,16 @@ class CryptoPaymentService:
                     'status': 'confirmed'
                 }
             
-            # 获取收款地址
-            payment_info = order.payment_info
-            if not payment_info:
-                return {
-                    'verified': False,
-                    'message': 'Payment info not found'
-                }
-            
-            # 确保payment_info是字典
-            if isinstance(payment_info, str):
-                try:
-                    import json
-                    payment_info = json.loads(payment_info)
-                except (json.JSONDecodeError, TypeError):
-                    return {
-                        'verified': False,
-                        'message': 'Invalid payment info format'
-                    }
-            
-            if not isinstance(payment_info, dict):
-                return {
-                    'verified': False,
-                    'message': 'Payment info is not a valid dictionary'
-                }
-            
-            token_symbol = payment_info.get('token_symbol', 'USDT')
-            network = payment_info.get('network', 'ethereum')
-            receiver_address = payment_info.get('receiver_address')
-            
-            if not receiver_address:
-                return {
-                    'verified': False,
-                    'message': 'Receiver address not found'
-                }
-            
-            # 使用Moralis API获取地址的交易历史
-            chain_mapping = {
-                'ethereum': 'eth',
-                'bsc': 'bsc',
-                'polygon': 'polygon'
-            }
-            
-            chain_param = chain_mapping.get(network, network)
-            
-            # 获取最近24小时的交易
-            url = f"{self.base_url}/{receiver_address}"
-            params = {
-                'chain': chain_param,
-                'from_date': (datetime.now() - timedelta(hours=24)).isoformat(),
-                'to_date': datetime.now().isoformat()
-            }
-            headers = {
-                'X-API-Key': self.moralis_api_key
-            }
-            
-            response = requests.get(url, params=params, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            transactions = response.json()
-            
-            # 检查是否有匹配的支付
-            for tx in transactions:
-                # 检查是否是指向收款地址的交易
-                if tx.get('to_address', '').lower() == receiver_address.lower():
-                    # 验证交易详情
-                    verification_result = self._validate_transaction(tx, order_id, token_symbol, network)
-                    
-                    if verification_result.get('verified'):
-                        # 更新订单状态
-                        order.status = 'paid'
-                        order.paid_at = timezone.now()
-                        order.save()
-                        
-                        logger.info(f'Payment auto-verified for order {order_id}: {tx.get("hash")}')
-                        return {
-                            'verified': True,
-                            'message': 'Payment auto-verified',
-                            'status': 'confirmed',
-                            'transaction_hash': tx.get('hash')
-                        }
-            
-            return {
-                'verified': False,
-                'message': 'No matching payment found',
-                'status': 'pending'
-            }
+            info, error = self._parse_order_payment_info(order)
+            if error:
+                return error
+            token_symbol, network, receiver_address, _ = info
+
+            transactions = self._fetch_address_history(network, receiver_address)
+            return self._match_order_payment(
+                order, transactions, token_symbol, network, receiver_address,
+                self._paid_tx_hashes(transactions)
+            )
             
         except requests.exceptions.RequestException as e:
             logger.error(f'Network error in auto-check payment: {e}')
@@ -631,5 +1233,155 @@ class CryptoPaymentService:
                 'status': 'error'
             }
 
-# 创建全局实例
-crypto_payment_service = CryptoPaymentService() 
\ No newline at end of file
+    def _fetch_address_histories(self, groups) -> dict:
+        """并发获取多个 (网络, 收款地址) 的交易历史，返回 {分组: 交易列表或请求异常}
+
+        请求都在等待网络，线程等待时会释放 GIL，总耗时接近最慢的一次请求；
+        只有一个分组时直接在当前线程请求，省去线程池开销
+        """
+        def fetch(key):
+            try:
+                return self._fetch_address_history(*key)
+            except requests.exceptions.RequestException as e:
+                return e
+
+        if len(groups) <= 1:
+            return {key: fetch(key) for key in groups}
+
+        histories = {}
+        with ThreadPoolExecutor(
+            max_workers=min(ADDRESS_HISTORY_WORKERS, len(groups)),
+            thread_name_prefix='address-history'
+        ) as executor:
+            futures = {executor.submit(fetch, key): key for key in groups}
+            for future in as_completed(futures):
+                histories[futures[future]] = future.result()
+        return histories
+
+    def _verify_submitted_payments(self, submitted: dict, results: dict) -> set:
+        """重新验证用户提交过、但当时确认数不足的交易，返回已确认订单的主键集合
+
+        submitted 为 {网络: [(order, token_symbol, tx_hash), ...]}。每个网络的交易回执
+        用一个 JSON-RPC 批量请求查询（未配置节点时并发请求 Moralis），验证通过的订单
+        直接确认，结果写入 results
+        """
+        confirmed = set()
+        for network, members in submitted.items():
+            jobs = [
+                {'order_id': order.order_id, 'token_symbol': token_symbol, 'tx_hash': tx_hash}
+                for order, token_symbol, tx_hash in members
+            ]
+            try:
+                verification_results = self.verify_payments_rpc_batch(jobs, network)
+            except Exception as e:
+                logger.error(f'Error verifying submitted payments on {network}: {e}')
+                continue
+            for (order, _, tx_hash), verification_result in zip(members, verification_results):
+                if not verification_result.get('verified'):
+                    continue
+                try:
+                    if self.complete_order_payment(order.pk, tx_hash, verification_result) is None:
+                        continue
+                except Exception as e:
+                    logger.error(f'Error confirming submitted payment for order {order.order_id}: {e}')
+                    continue
+                confirmed.add(order.pk)
+                logger.info(f'Submitted payment confirmed for order {order.order_id}: {tx_hash}')
+                results[order.order_id] = {
+                    'verified': True,
+                    'message': 'Payment verified',
+                    'status': 'confirmed',
+                    'transaction_hash': tx_hash
+                }
+        return confirmed
+
+    def auto_check_payments_bulk(self, order_ids) -> dict:
+        """批量自动检查多个订单的支付状态，返回 {order_id: 检查结果}
+
+        一条查询取出所有订单。用户提交过交易哈希的订单先按网络批量验证该交易；
+        其余订单按 (网络, 收款地址) 分组后每组只请求一次 Moralis 地址交易历史，
+        再在同一份交易列表里逐个订单匹配支付
+        """
+        from user.models import MembershipOrder
+
+        results = {}
+        groups = {}
+        submitted = {}
+        for order in MembershipOrder.objects.filter(order_id__in=order_ids):
+            if order.status == 'paid':
+                results[order.order_id] = {
+                    'verified': True,
+                    'message': 'Payment already confirmed',
+                    'status': 'confirmed'
+                }
+                continue
+
+            info, error = self._parse_order_payment_info(order)
+            if error:
+                results[order.order_id] = error
+                continue
+            token_symbol, network, receiver_address, submitted_tx_hash = info
+            if submitted_tx_hash:
+                submitted.setdefault(network, []).append((order, token_symbol, submitted_tx_hash))
+            groups.setdefault((network, receiver_address.lower()), []).append(
+                (order, token_symbol, receiver_address)
+            )
+
+        for order_id in order_ids:
+            results.setdefault(order_id, {
+                'verified': False,
+                'message': 'Order not found'
+            })
+
+        # 已经提交过交易哈希的订单先直接验证这笔交易，确认的订单不再匹配地址交易历史
+        confirmed = self._verify_submitted_payments(submitted, results)
+        groups = {
+            key: remaining for key, members in groups.items()
+            if (remaining := [member for member in members if member[0].pk not in confirmed])
+        }
+
+        histories = self._fetch_address_histories(groups)
+
+        for (network, receiver_lc), members in groups.items():
+            transactions = histories[(network, receiver_lc)]
+            if isinstance(transactions, Exception):
+                e = transactions
+                logger.error(f'Network error in bulk auto-check for {network}:{receiver_lc}: {e}')
+                for order, _, _ in members:
+                    results[order.order_id] = {
+                        'verified': False,
+                        'message': f'Network error: {str(e)}',
+                        'status': 'error'
+                    }
+                continue
+
+            used_hashes = self._paid_tx_hashes(transactions)
+            for order, token_symbol, receiver_address in members:
+                try:
+                    results[order.order_id] = self._match_order_payment(
+                        order, transactions, token_symbol, network, receiver_address, used_hashes
+                    )
+                except Exception as e:
+                    logger.error(f'Error in auto-check payment for order {order.order_id}: {e}')
+                    results[order.order_id] = {
+                        'verified': False,
+                        'message': f'Auto-check error: {str(e)}',
+                        'status': 'error'
+                    }
+
+        return results
+
+# 全局实例在第一次使用时创建：导入模块不再要求配置 MORALIS_API_KEY，
+# 也不会在用不到加密支付的进程里建立 HTTP 会话
+_crypto_payment_service = None
+_crypto_payment_service_lock = threading.Lock()
+
+
+def get_crypto_payment_service() -> CryptoPaymentService:
+    """获取全局的加密货币支付服务实例"""
+    global _crypto_payment_service
+    if _crypto_payment_service is None:
+        with _crypto_payment_service_lock:
+            if _crypto_payment_service is None:
+                _crypto_payment_service = CryptoPaymentService()
+    return _crypto_payment_service 
\ No newline at end of file
@@ -0,0 +1,12 @@
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import SystemSetting
+
+
+@receiver(post_save, sender=SystemSetting)
+@receiver(post_delete, sender=SystemSetting)
+def invalidate_system_setting_cache(sender, instance, **kwargs):
+    """系统设置变更时清除对应的缓存"""
+    if instance.key == 'invitation_points':
+        cache.delete(SystemSetting.INVITATION_POINTS_CACHE_KEY)
@@ -1,7 +1,12 @@
 import logging
+from datetime import timedelta
+from celery import shared_task
 from django.utils import timezone
 from django.db import transaction
-from user.models import MembershipOrder
+from user.models import MembershipOrder, VerificationCode
+
+# 验证码过期后再保留一天，便于排查问题
+VERIFICATION_CODE_RETENTION = timedelta(days=1)
 
 logger = logging.getLogger(__name__)
 
@@ -9,20 +14,62 @@ def cleanup_expired_orders():
     """清理过期的订单"""
     try:
         with transaction.atomic():
-            # 查找所有过期的待支付订单
-            expired_orders = MembershipOrder.objects.filter(
+            # 一条 UPDATE 把所有过期的待支付订单标记为已过期，返回值即受影响的行数
+            expired_count = MembershipOrder.objects.filter(
                 status='pending',
                 expires_at__lt=timezone.now()
-            )
-            
-            expired_count = expired_orders.count()
+            ).update(status='expired')
+
             if expired_count > 0:
-                # 批量更新订单状态为已过期
-                expired_orders.update(status='expired')
                 logger.info(f'Cleaned up {expired_count} expired orders')
             else:
                 logger.info('No expired orders to clean up')
                 
     except Exception as e:
         logger.error(f'Error cleaning up expired orders: {e}')
-        raise 
\ No newline at end of file
+        raise
+
+def cleanup_expired_verification_codes():
+    """删除过期超过保留期的验证码，避免验证码表无限增长"""
+    try:
+        # 一条 DELETE ... WHERE expires_at < ?，走 expires_at 索引的范围扫描
+        deleted_count, _ = VerificationCode.objects.filter(
+            expires_at__lt=timezone.now() - VERIFICATION_CODE_RETENTION
+        ).delete()
+
+        if deleted_count > 0:
+            logger.info(f'Deleted {deleted_count} expired verification codes')
+        else:
+            logger.info('No expired verification codes to delete')
+
+    except Exception as e:
+        logger.error(f'Error cleaning up expired verification codes: {e}')
+        raise
+
+@shared_task
+def check_pending_payments():
+    """批量检查所有未过期的待支付订单是否已经到账"""
+    from user.services.crypto_payment_service import get_crypto_payment_service
+
+    try:
+        order_ids = list(
+            MembershipOrder.objects.filter(
+                status='pending',
+                expires_at__gte=timezone.now()
+            ).values_list('order_id', flat=True)
+        )
+        if not order_ids:
+            logger.info('No pending orders to check')
+            return {}
+
+        # 同一收款地址的订单共用一次地址交易历史请求
+        results = get_crypto_payment_service().auto_check_payments_bulk(order_ids)
+        paid_count = sum(
+            1 for result in results.values() if result.get('status') == 'confirmed'
+        )
+        logger.info(f'Checked {len(order_ids)} pending orders, {paid_count} confirmed')
+        return results
+
+    except Exception as e:
+        logger.error(f'Error checking pending payments: {e}')
+        raise
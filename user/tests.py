@@ -1,3 +1,238 @@
+import os
+from decimal import Decimal
+from datetime import timedelta
+from unittest import mock
+
 from django.test import TestCase
+from django.utils import timezone
+
+from user.models import MembershipOrder, MembershipPlan, PointsTransaction, User, generate_order_id
+from user.services import crypto_payment_service as payment_module
+from user.services.crypto_payment_service import CryptoPaymentService
+
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+
+
+def make_transfer(tx_hash, receiver, token_amount, confirmations=100):
+    """构造一笔 Moralis 格式的 ERC20 Transfer 交易"""
+    return {
+        'hash': tx_hash,
+        'to_address': receiver,
+        'receipt_status': '1',
+        'confirmations': confirmations,
+        'logs': [{
+            'topic0': TRANSFER_TOPIC,
+            'topics': [TRANSFER_TOPIC, '0x' + '0' * 64, '0x' + receiver[2:].rjust(64, '0')],
+            'data': '0x' + format(int(token_amount * payment_module.TOKEN_UNIT), '064x'),
+        }],
+    }
+
+
+class GenerateOrderIdTests(TestCase):
+    """订单号生成"""
+
+    def test_order_ids_are_unique_prefixed_and_fit_the_column(self):
+        max_length = MembershipOrder._meta.get_field('order_id').max_length
+        # 一个完整的序列号周期（4096 个）内即使落在同一毫秒也不会重复
+        order_ids = [generate_order_id() for _ in range(4096)]
+
+        self.assertEqual(len(set(order_ids)), len(order_ids))
+        for order_id in order_ids:
+            self.assertTrue(order_id.startswith('MB'))
+            self.assertLessEqual(len(order_id), max_length)
+
+    def test_order_ids_sort_by_creation_order(self):
+        order_ids = [generate_order_id() for _ in range(100)]
+
+        self.assertEqual(order_ids, sorted(order_ids))
+
+
+class PaymentTestCase(TestCase):
+    """加密货币支付测试的公共数据"""
+
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {'MORALIS_API_KEY': 'test-key'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = CryptoPaymentService()
+        self.receiver = payment_module.RECEIVER_ADDRESSES_LC['USDT']['ethereum']
+        self.plan = MembershipPlan.objects.create(name='月度会员', plan_type='monthly', price=Decimal('10'), duration_days=30)
+
+    def create_order(self, email, token_amount='10'):
+        user = User.objects.create_user(email=email, password='Passw0rd!')
+        return MembershipOrder.objects.create(
+            user=user,
+            plan=self.plan,
+            amount=Decimal('10'),
+            expires_at=timezone.now() + timedelta(hours=1),
+            payment_info={
+                'token_symbol': 'USDT',
+                'network': 'ethereum',
+                'receiver_address': self.receiver,
+                'token_amount': token_amount,
+            },
+        )
+
+
+class ServiceConfigTests(PaymentTestCase):
+    """服务初始化"""
+
+    def test_rpc_urls_are_resolved_once_for_configured_networks(self):
+        with mock.patch.dict(os.environ, {'ETH_RPC_URL': 'https://eth.example'}):
+            os.environ.pop('BSC_RPC_URL', None)
+            os.environ.pop('POLYGON_RPC_URL', None)
+            service = CryptoPaymentService()
+
+        self.assertEqual(service.rpc_urls, {'ethereum': 'https://eth.example'})
+
+
+class ValidateTransactionTests(PaymentTestCase):
+    """交易验证"""
+
+    def test_receiver_is_read_from_last_20_bytes_of_transfer_topic(self):
+        order = self.create_order('topic@example.com')
+        tx = make_transfer('0xaaa', self.receiver, Decimal('10'))
+
+        result = self.service._validate_transaction(tx, order.order_id, 'USDT', 'ethereum')
+
+        self.assertTrue(result['verified'], result['message'])
+
+    def test_transfer_to_another_address_is_rejected(self):
+        order = self.create_order('other@example.com')
+        tx = make_transfer('0xaaa', '0x' + 'b' * 40, Decimal('10'))
+
+        result = self.service._validate_transaction(tx, order.order_id, 'USDT', 'ethereum')
+
+        self.assertFalse(result['verified'])
+        self.assertIn('Receiver address mismatch', result['message'])
+
+
+class SubmittedPaymentTests(PaymentTestCase):
+    """确认数不足时提交的交易哈希由批量检查重新验证"""
+
+    def test_bulk_check_confirms_submitted_tx_hash_with_one_rpc_batch(self):
+        order = self.create_order('submitted@example.com')
+        order.payment_info['submitted_tx_hash'] = '0xsubmitted'
+        order.save()
+        transfer = make_transfer('0xsubmitted', self.receiver, Decimal('10'))
+        receipt = {
+            'transactionHash': '0xsubmitted',
+            'to': transfer['to_address'],
+            'status': '0x1',
+            'blockNumber': hex(100),
+            'logs': [{'topics': transfer['logs'][0]['topics'], 'data': transfer['logs'][0]['data']}],
+        }
+        response = mock.Mock(content=payment_module.orjson.dumps([
+            {'id': 0, 'result': hex(200)},
+            {'id': 1, 'result': receipt},
+        ]))
+        self.service.rpc_urls = {'ethereum': 'https://node.example'}
+
+        with mock.patch.object(self.service.rpc_session, 'post', return_value=response) as post, \
+                mock.patch.object(self.service, '_fetch_address_history') as fetch_history:
+            results = self.service.auto_check_payments_bulk([order.order_id])
+
+        self.assertEqual(post.call_count, 1)
+        fetch_history.assert_not_called()
+        self.assertEqual(results[order.order_id]['status'], 'confirmed')
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'paid')
+        self.assertEqual(order.tx_hash, '0xsubmitted')
+        self.assertTrue(User.objects.get(pk=order.user_id).is_premium)
+
+
+class CompleteOrderPaymentTests(PaymentTestCase):
+    """订单确认：锁定订单、激活会员、发放积分"""
+
+    def test_completes_order_and_activates_membership(self):
+        order = self.create_order('complete@example.com')
+
+        completed = self.service.complete_order_payment(order.pk, '0xaaa', {'verified': True})
+
+        self.assertIsNotNone(completed)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'paid')
+        self.assertEqual(order.tx_hash, '0xaaa')
+        user = User.objects.get(pk=order.user_id)
+        self.assertTrue(user.is_premium)
+        self.assertEqual(user.points, 100)
+        self.assertEqual(PointsTransaction.objects.filter(user=user).count(), 1)
+
+    def test_tx_hash_used_by_another_order_is_rejected(self):
+        first = self.create_order('first@example.com')
+        second = self.create_order('second@example.com')
+        self.service.complete_order_payment(first.pk, '0xaaa', {'verified': True})
+
+        self.assertIsNone(self.service.complete_order_payment(second.pk, '0xaaa', {'verified': True}))
+
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'pending')
+        self.assertIsNone(second.tx_hash)
+        self.assertFalse(User.objects.get(pk=second.user_id).is_premium)
+
+    def test_completing_an_order_twice_is_a_no_op(self):
+        order = self.create_order('twice@example.com')
+        self.service.complete_order_payment(order.pk, '0xaaa', {'verified': True})
+        expires_at = User.objects.get(pk=order.user_id).premium_expires_at
+
+        self.assertIsNone(self.service.complete_order_payment(order.pk, '0xaaa', {'verified': True}))
+
+        user = User.objects.get(pk=order.user_id)
+        self.assertEqual(user.premium_expires_at, expires_at)
+        self.assertEqual(user.points, 100)
+        self.assertEqual(PointsTransaction.objects.filter(user=user).count(), 1)
+
+
+class BulkPaymentCheckTests(PaymentTestCase):
+    """批量检查待支付订单"""
+
+    def test_each_transaction_confirms_only_one_order(self):
+        orders = [self.create_order(f'bulk{i}@example.com') for i in range(3)]
+        history = [make_transfer('0xaaa', self.receiver, Decimal('10'))]
+
+        with mock.patch.object(self.service, '_fetch_address_history', return_value=history) as fetch_history:
+            results = self.service.auto_check_payments_bulk([order.order_id for order in orders])
+
+        fetch_history.assert_called_once()
+        statuses = sorted(result['status'] for result in results.values())
+        self.assertEqual(statuses, ['confirmed', 'pending', 'pending'])
+        self.assertEqual(MembershipOrder.objects.filter(status='paid', tx_hash='0xaaa').count(), 1)
+
+    def test_transaction_of_a_paid_order_is_not_reused_on_the_next_run(self):
+        orders = [self.create_order(f'rerun{i}@example.com') for i in range(2)]
+        history = [make_transfer('0xaaa', self.receiver, Decimal('10'))]
+
+        with mock.patch.object(self.service, '_fetch_address_history', return_value=history):
+            self.service.auto_check_payments_bulk([order.order_id for order in orders])
+            results = self.service.auto_check_payments_bulk([order.order_id for order in orders])
+
+        self.assertEqual(sorted(result['status'] for result in results.values()), ['confirmed', 'pending'])
+        self.assertEqual(MembershipOrder.objects.filter(status='paid').count(), 1)
+
+    def test_receiver_groups_are_fetched_concurrently_and_matched_separately(self):
+        eth_order = self.create_order('eth@example.com')
+        bsc_order = self.create_order('bsc@example.com')
+        bsc_receiver = payment_module.RECEIVER_ADDRESSES_LC['USDT']['bsc']
+        bsc_order.payment_info.update(network='bsc', receiver_address=bsc_receiver)
+        bsc_order.save()
+        histories = {
+            ('ethereum', self.receiver): [make_transfer('0xeth', self.receiver, Decimal('10'))],
+            ('bsc', bsc_receiver): [make_transfer('0xbsc', bsc_receiver, Decimal('10'))],
+        }
+
+        with mock.patch.object(self.service, '_fetch_address_history', side_effect=lambda *key: histories[key]):
+            results = self.service.auto_check_payments_bulk([eth_order.order_id, bsc_order.order_id])
+
+        self.assertEqual(results[eth_order.order_id]['transaction_hash'], '0xeth')
+        self.assertEqual(results[bsc_order.order_id]['transaction_hash'], '0xbsc')
+
+    def test_expected_amount_of_legacy_order_is_priced_once(self):
+        order = self.create_order('legacy@example.com', token_amount='0')
+        history = [make_transfer(f'0x{i}', self.receiver, Decimal('3')) for i in range(5)]
+
+        with mock.patch.object(self.service, '_fetch_address_history', return_value=history), \
+                mock.patch.object(self.service, '_fetch_token_price', return_value=Decimal('1')) as fetch_price:
+            results = self.service.auto_check_payments_bulk([order.order_id])
 
-# Create your tests here.
+        self.assertEqual(results[order.order_id]['status'], 'pending')
+        fetch_price.assert_called_once()
@@ -2,10 +2,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.conf import settings
-from .models import User, VerificationCode, InvitationCode, InvitationRecord, SystemSetting, TemporaryInvitation, MembershipPlan, MembershipOrder, PointsTransaction
+from .models import User, VerificationCode, InvitationCode, InvitationRecord, SystemSetting, TemporaryInvitation, MembershipPlan, MembershipOrder, PointsTransaction, random_code
 from django.utils import timezone
-import random
-import string
+import secrets
 from datetime import timedelta
 import traceback
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -17,10 +16,11 @@ from .serializers import (
     ChangePasswordSerializer, ResetPasswordWithCodeSerializer, ResetPasswordCodeSerializer,
     InvitationCodeSerializer, InvitationRecordSerializer,
     MembershipPlanSerializer, MembershipOrderSerializer, CreateMembershipOrderSerializer,
-    PointsTransactionSerializer, UserMembershipStatusSerializer
+    PointsTransactionSerializer, UserMembershipStatusSerializer, rotate_auth_token
 )
 from django.core.mail import send_mail
 from django.db import transaction
+from django.db.models import F
 import logging
 
 # 创建日志记录器
@@ -42,7 +42,7 @@ class SendVerificationCodeView(APIView):
             email = serializer.validated_data['email']
 
             # 生成6位数字验证码
-            code = ''.join(random.choices(string.digits, k=6))
+            code = f"{secrets.randbelow(10 ** 6):06d}"
 
             # 保存验证码
             expires_at = timezone.now() + timedelta(minutes=10)
@@ -116,15 +116,11 @@ class RegisterView(APIView):
 
             # 使用事务确保所有操作要么全部成功，要么全部失败
             with transaction.atomic():
-                # 生成随机用户名
-                username = f"user_{''.join(random.choices(string.ascii_lowercase + string.digits, k=8))}"
-
-                # 创建用户
+                # 创建用户（create_user 会生成随机用户名）
                 user = User.objects.create_user(
                     email=email,
                     password=serializer.validated_data['password']
                 )
-                user.username = username
                 user.is_active = True  # 设置用户为激活状态
 
                 # 处理邀请码
@@ -159,8 +155,8 @@ class RegisterView(APIView):
                             # 给邀请人增加积分 (确保邀请人存在且不是自己，并且没有重复奖励)
                             if inviter and inviter != user and not InvitationRecord.objects.filter(inviter=inviter, invitee=user).exists():
                                 invitation_points = SystemSetting.get_invitation_points()
-                                inviter.points += invitation_points
-                                inviter.save()
+                                # 原子地累加积分，不重写邀请人的整行数据
+                                User.objects.filter(pk=inviter.pk).update(points=F('points') + invitation_points)
 
                                 # 创建邀请记录
                                 InvitationRecord.objects.create(
@@ -323,7 +319,7 @@ class GenerateInvitationCodeView(APIView):
         """生成一次性邀请码"""
         try:
             # 生成随机邀请码
-            code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+            code = random_code(8)
 
             # 创建邀请码
             invitation = InvitationCode.objects.create(
@@ -359,8 +355,11 @@ class UserInvitationView(APIView):
             # 获取用户的个人邀请码
             invitation = user.get_personal_invitation_code()
 
-            # 获取用户的邀请记录
-            invitation_records = InvitationRecord.objects.filter(inviter=user).order_by('-created_at')
+            # 获取用户的邀请记录（JOIN 取被邀请人，只查询序列化需要的列）
+            invitation_records = InvitationRecord.objects.filter(inviter=user).select_related('invitee').only(
+                'points_awarded', 'created_at', 'invitee__email', 'invitee__username'
+            ).order_by('-created_at')
+            records_data = InvitationRecordSerializer(invitation_records, many=True).data
 
             # 获取邀请积分设置
             invitation_points = SystemSetting.get_invitation_points()
@@ -371,8 +370,8 @@ class UserInvitationView(APIView):
                     'invitation_code': invitation.code,
                     'points': user.points,
                     'invitation_points_per_user': invitation_points,
-                    'invitation_count': invitation_records.count(),
-                    'invitation_records': InvitationRecordSerializer(invitation_records, many=True).data
+                    'invitation_count': len(records_data),
+                    'invitation_records': records_data
                 }
             })
         except Exception as e:
@@ -435,15 +434,14 @@ class ChangePasswordView(APIView):
         user.set_password(new_password)
         user.save()
 
-        # 删除并重新生成认证令牌
-        AuthToken.objects.filter(user=user).delete()
-        token = AuthToken.objects.create(user=user)
+        # 重新生成认证令牌
+        token_key = rotate_auth_token(user)
 
         return Response({
             'status': 'success',
             'message': '密码修改成功',
             'data': {
-                'token': token.key
+                'token': token_key
             }
         })
 
@@ -467,7 +465,7 @@ class RequestPasswordResetView(APIView):
             user = User.objects.get(email=email)
 
             # 生成6位数字验证码
-            code = ''.join(random.choices(string.digits, k=6))
+            code = f"{secrets.randbelow(10 ** 6):06d}"
 
             # 删除该邮箱之前的所有未使用验证码
             VerificationCode.objects.filter(
@@ -556,14 +554,13 @@ class ResetPasswordWithCodeView(APIView):
             verification.save()
 
             # 生成新的认证令牌
-            AuthToken.objects.filter(user=user).delete()
-            token = AuthToken.objects.create(user=user)
+            token_key = rotate_auth_token(user)
 
             return Response({
                 'status': 'success',
                 'message': '密码重置成功',
                 'data': {
-                    'token': token.key,
+                    'token': token_key,
                     'user': UserSerializer(user).data
                 }
             })
@@ -655,8 +652,8 @@ class ClaimTemporaryInvitationView(APIView):
                     if inviter and inviter != user:
                         # 给邀请人增加积分
                         invitation_points = SystemSetting.get_invitation_points()
-                        inviter.points += invitation_points
-                        inviter.save()
+                        # 原子地累加积分，不重写邀请人的整行数据
+                        User.objects.filter(pk=inviter.pk).update(points=F('points') + invitation_points)
 
                         # 创建邀请记录
                         InvitationRecord.objects.create(
@@ -802,7 +799,11 @@ class UserMembershipOrdersView(APIView):
     def get(self, request):
         """获取用户的会员订单列表"""
         try:
-            orders = MembershipOrder.objects.filter(user=request.user).order_by('-created_at')
+            # JOIN 取套餐名称，只查询序列化需要的列（不读取 payment_info）
+            orders = MembershipOrder.objects.filter(user=request.user).select_related('plan').only(
+                'id', 'order_id', 'plan__name', 'plan__plan_type', 'amount', 'status',
+                'payment_method', 'created_at', 'paid_at', 'expires_at'
+            ).order_by('-created_at')
             serializer = MembershipOrderSerializer(orders, many=True)
 
             return Response({
@@ -1075,7 +1076,9 @@ class PointsTransactionHistoryView(APIView):
     def get(self, request):
         """获取用户的积分交易历史"""
         try:
-            transactions = PointsTransaction.objects.filter(user=request.user).order_by('-created_at')[:50]
+            transactions = PointsTransaction.objects.filter(user=request.user).only(
+                'id', 'transaction_type', 'amount', 'reason', 'description', 'created_at'
+            ).order_by('-created_at')[:50]
             serializer = PointsTransactionSerializer(transactions, many=True)
 
             return Response({
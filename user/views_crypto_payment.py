@@ -1,6 +1,6 @@
 import logging
 from decimal import Decimal
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
@@ -11,35 +11,28 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 import json
-from datetime import timedelta
-from django.utils import timezone
+import orjson
 
 from .models import MembershipOrder, MembershipPlan, User, PointsTransaction
-from .services.crypto_payment_service import crypto_payment_service
+from .services.crypto_payment_service import get_crypto_payment_service, SUPPORTED_TOKENS, SUPPORTED_NETWORKS, PAYMENT_REQUEST_TTL
 
 logger = logging.getLogger(__name__)
 
+# 支持的代币和网络是固定的，响应体在导入时序列化一次
+SUPPORTED_TOKENS_RESPONSE = orjson.dumps({
+    'status': 'success',
+    'data': {
+        'tokens': SUPPORTED_TOKENS,
+        'networks': SUPPORTED_NETWORKS
+    }
+})
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_supported_tokens(request):
     """获取支持的代币列表"""
-    try:
-        tokens = crypto_payment_service.get_supported_tokens()
-        networks = crypto_payment_service.get_supported_networks()
-        
-        return Response({
-            'status': 'success',
-            'data': {
-                'tokens': tokens,
-                'networks': networks
-            }
-        })
-    except Exception as e:
-        logger.error(f'Error getting supported tokens: {e}')
-        return Response({
-            'status': 'error',
-            'message': 'Failed to get supported tokens'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    # 直接返回预先序列化好的 JSON，跳过 DRF 的内容协商和渲染器
+    return HttpResponse(SUPPORTED_TOKENS_RESPONSE, content_type='application/json')
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -104,11 +97,11 @@ def create_crypto_payment_order(request):
             amount=plan.price,
             payment_method=f'{token_symbol.lower()}_{network}',
             status='pending',
-            expires_at=timezone.now() + timedelta(hours=24)
+            expires_at=timezone.now() + PAYMENT_REQUEST_TTL
         )
         
         # 创建支付请求
-        payment_request = crypto_payment_service.create_payment_request(
+        payment_request = get_crypto_payment_service().create_payment_request(
             order_id=order_id,
             amount_usd=plan.price,
             token_symbol=token_symbol,
@@ -161,9 +154,9 @@ def verify_crypto_payment(request):
         # 检查交易hash是否已经被使用过
         from user.models import MembershipOrder
         existing_order_with_tx = MembershipOrder.objects.filter(
-            payment_info__contains=tx_hash,
+            tx_hash=tx_hash,
             status='paid'
-        ).first()
+        ).only('order_id').first()
         
         if existing_order_with_tx:
             logger.warning(f'Transaction hash {tx_hash} has already been used for order {existing_order_with_tx.order_id}')
@@ -191,7 +184,7 @@ def verify_crypto_payment(request):
         # 验证支付
         logger.info(f'Starting verification for order {order_id}, tx_hash: {tx_hash}, token: {token_symbol}, network: {network}')
         
-        verification_result = crypto_payment_service.verify_payment(
+        verification_result = get_crypto_payment_service().verify_payment(
             order_id=order_id,
             token_symbol=token_symbol,
             network=network,
@@ -201,48 +194,15 @@ def verify_crypto_payment(request):
         logger.info(f'Verification result for order {order_id}: {verification_result}')
         
         if verification_result['verified']:
-            # 支付验证成功，更新订单状态
-            order.status = 'paid'
-            order.paid_at = timezone.now()
-            
-            # 确保 payment_info 是字典格式
-            if isinstance(order.payment_info, str):
-                import json
-                payment_info = json.loads(order.payment_info)
-            else:
-                payment_info = order.payment_info or {}
-            
-            payment_info['tx_hash'] = tx_hash
-            payment_info['verification_result'] = verification_result
-            order.payment_info = payment_info
-            order.save()
-            
-            # 激活会员
-            user = request.user
-            if user.premium_expires_at and user.premium_expires_at > timezone.now():
-                # 如果会员未过期，延长会员时间
-                user.premium_expires_at += timedelta(days=order.plan.duration_days)
-            else:
-                # 如果会员已过期或从未购买过，设置新的到期时间
-                user.premium_expires_at = timezone.now() + timedelta(days=order.plan.duration_days)
-            
-            user.is_premium = True
-            user.save()
-            
-            # 计算积分奖励（1:10比例）
-            points_to_award = int(float(order.amount) * 10)
-            user.points += points_to_award
-            user.save()
-            
-            # 记录积分交易
-            from user.models import PointsTransaction
-            PointsTransaction.objects.create(
-                user=user,
-                transaction_type='earn',
-                amount=points_to_award,
-                reason='premium_purchase',
-                description=f'会员购买奖励 - 订单 {order_id}'
-            )
+            # 支付验证成功：锁定订单后更新状态、激活会员并发放积分
+            completed = get_crypto_payment_service().complete_order_payment(order.pk, tx_hash, verification_result)
+            if completed is None:
+                logger.warning(f'Order {order_id} was processed concurrently or tx_hash {tx_hash} was already used')
+                return Response({
+                    'status': 'error',
+                    'message': 'Order not found or already processed'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            order, user, points_to_award = completed
             
             logger.info(f'Payment verified successfully for order {order_id}. User {user.id} awarded {points_to_award} points.')
             
@@ -257,6 +217,11 @@ def verify_crypto_payment(request):
             })
         else:
             logger.warning(f'Payment verification failed for order {order_id}: {verification_result.get("message", "Unknown error")}')
+            if 'retry_after_seconds' in verification_result:
+                # 确认数不足：记下交易哈希，待支付检查任务会在确认数足够后自动确认订单
+                payment_info = order.payment_info if isinstance(order.payment_info, dict) else json.loads(order.payment_info or '{}')
+                payment_info['submitted_tx_hash'] = tx_hash
+                MembershipOrder.objects.filter(pk=order.pk, status='pending').update(payment_info=payment_info)
             return Response({
                 'status': 'error',
                 'message': verification_result.get('message', 'Payment verification failed')
@@ -290,7 +255,7 @@ def get_crypto_payment_status(request, order_id):
         
         # 如果订单状态是pending，尝试自动检查支付
         if order.status == 'pending':
-            auto_check_result = crypto_payment_service.auto_check_payment(order_id)
+            auto_check_result = get_crypto_payment_service().auto_check_payment(order_id)
             
             # 如果自动检查成功，重新获取订单信息
             if auto_check_result.get('verified'):
@@ -326,7 +291,7 @@ def get_token_price(request):
         token_symbol = request.GET.get('token', 'USDT')
         network = request.GET.get('network', 'ethereum')
         
-        price = crypto_payment_service.get_token_price(token_symbol, network)
+        price = get_crypto_payment_service().get_token_price(token_symbol, network)
         
         return Response({
             'status': 'success',